@@ -1,51 +1,174 @@
 import streamlit as st
-import pandas as pd
-import polars as pl
-import time
-
-from data_utils import load_csv, parse_vod_id, apply_filters
-from processing import (
-    add_sliding_windows,
-    add_tumbling_window,
-    compute_sliding_windows, # legacy function, might use later, might delete
-    format_vod_timestamp_url,
-    format_seconds_to_ts,
-    get_top_peaks
-)
-from charts import make_chart
-from tables import render_top_table
+
+from instrumentation import PipelineRun
+
+# Everything else (polars, numpy, plotly and the pipeline modules) is imported once a file or
+# the demo is picked, so a fresh server process renders the landing page without loading them
+
+@st.cache_resource
+def open_peak_index():
+    from peak_index import connect
+    return connect()
+
+def render_live():
+    """Live mode: windows are updated by a background LiveSession, the chart refreshes from its state."""
+    import polars as pl
+    from charts import make_chart
+    from data_utils import load_csv
+    from demo_artifact import DEMO_PATH
+    from downsampling import CHART_MAX_POINTS, build_pyramid, downsample_rows
+    from live import LiveSession, LiveWindows, irc_source, standin_source, tail_source
+    from processing import ts_expr
+
+    source = st.radio("Live source", ["Stand-in replay of the demo VOD", "Tail a CSV export", "IRC chat"], horizontal=True)
+    if source == "IRC chat":
+        server = st.text_input("IRC server", "irc.chat.twitch.tv:6667")
+        channel = st.text_input("Channel")
+    elif source == "Tail a CSV export":
+        tail_path = st.text_input("Path of the CSV being written")
+    else:
+        speed = st.select_slider("Replay speed", options=[1, 10, 60, 600], value=60)
+    window_type = st.radio("Windowing function", ["Tumbling", "Sliding"], index=1, horizontal=True)
+    window_size = st.select_slider("Window size (s)", options=list(range(6, 16)), value=12)
+    slack = st.selectbox("Time difference between peaks (s)", (30, 45, 60, 75, 90, 120), index=5)
+    min_alert = st.number_input("Only alert peaks with at least this many unique users", min_value=0, value=10)
+
+    start_col, stop_col = st.columns(2)
+    session = st.session_state.get("live_session")
+    if start_col.button("▶️ Start", use_container_width=True):
+        if session is not None:
+            session.stop()
+        if source == "IRC chat":
+            host, _, port = server.rpartition(":")
+            make_source = irc_source(host, int(port), channel)
+        elif source == "Tail a CSV export":
+            make_source = tail_source(tail_path)
+        else:
+            make_source = standin_source(load_csv(DEMO_PATH), speed)
+        session = st.session_state["live_session"] = LiveSession(LiveWindows(window_size, slack, min_alert), make_source)
+    if stop_col.button("⏹️ Stop", use_container_width=True, disabled=session is None) and session is not None:
+        session.stop()
+
+    @st.fragment(run_every="2s")
+    def live_chart():
+        if session is None:
+            st.info("Pick a source and press Start.", icon="ℹ️")
+            return
+        if session.error:
+            st.error(session.error)
+        series = session.live.snapshot(window_type)
+        st.caption(f"{'🔴 Live' if session.running else '⏹️ Stopped'}: {session.live.messages} messages, {series.height} windows")
+        uuiw = series["UUIW"].to_numpy()
+        rows = downsample_rows(uuiw, build_pyramid(uuiw), 0, len(uuiw), CHART_MAX_POINTS, keep_min=True)
+        st.plotly_chart(make_chart(series[rows], "Line"), config={"scrollZoom": False})
+        alerts = session.live.alerts_frame().with_columns(ts_expr(pl.col("Time")).alias("Timestamp"))
+        st.dataframe(alerts.reverse(), use_container_width=True, hide_index=True)
+
+    live_chart()
 
 st.set_page_config(page_title="Twitch VOD Chat Peaks Analyzer", layout="wide", page_icon="🔍")
 
 st.title("🔍 VOD Chat Analyzer")
 
+# Per-stage timings, shown with ?debug=1 and written as JSON lines when CHAT_METRICS is set
+run = PipelineRun()
+show_debug = st.query_params.get("debug") not in (None, "", "0")
+
+if st.toggle("📡 Live mode"):
+    render_live()
+    st.stop()
+
 use_demo = False
-uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"])
+uploaded_file = st.file_uploader("Upload your CSV file (or a TwitchDownloader / chat-downloader JSON dump)", type=["csv", "json"])
 if uploaded_file is None:
     use_demo = st.toggle('Show demo?')
-if use_demo and uploaded_file is None:
-    file_name = 'twitch-chat-2587926699.csv'
-    df = pl.read_csv(file_name, encoding="utf8-lossy", truncate_ragged_lines=True)
-elif not use_demo and uploaded_file is not None:
-    file_name = uploaded_file.name
-    df = load_csv(uploaded_file)
 
 if use_demo or uploaded_file is not None:
+    import os
+
+    import polars as pl
+
+    from cache_utils import file_digest
+    from data_utils import load_csv, parse_vod_id, apply_filters
+    from demo_artifact import DEMO_FILE, DEMO_PATH, load_demo, load_demo_windows
+    from filters import load_filter_config
+    from processing import (
+        prepare_messages,
+        compute_sliding_windows, # legacy function, might use later, might delete
+        add_timestamps,
+        add_surprise,
+        select_peaks,
+        uuiw_messages,
+    )
+    from chat_index import build_chat_index, index_sliding_windows, index_tumbling_windows, messages_in_range
+    from hll import hll_standard_error, hll_sliding_windows, hll_tumbling_windows, load_second_sketches
+    from charts import chart_point_preview, make_chart
+    from downsampling import CHART_MAX_POINTS, build_pyramid, downsample_rows
+    from tables import render_top_table, top_table_html
+    from stage_cache import StageCache
+    from user_index import build_user_index, leaderboard, user_activity, user_messages
+    from peak_index import delete_vod, list_vods, load_series, save_vod, top_moments
+    from term_counts import term_frequencies
+    from term_index import keyword_spikes, load_term_index
+    from export import EXPORT_FORMATS, results_bytes, results_frame
+
+    # Every stage below is memoized on its inputs' key plus its own controls, so a rerun only
+    # recomputes what is downstream of the widget that changed
+    stage_cache = st.session_state.setdefault("stage_cache", StageCache())
+    # Hashing reads the whole file, so it's done once per upload rather than on every rerun
+    file_digests = st.session_state.setdefault("file_digests", {})
+
+    def session_digest(key, file):
+        if key not in file_digests:
+            file_digests[key] = file_digest(file)
+        return file_digests[key]
+
+    if use_demo:
+        file_name = DEMO_FILE
+        with run.stage("ingest") as stage:
+            stat = os.stat(DEMO_PATH)
+            digest = session_digest((DEMO_PATH, stat.st_size, stat.st_mtime_ns), DEMO_PATH)
+            # A prebuilt copy ships with the repo (demo_artifact.py), no parsing on a fresh server
+            df = stage["rows_out"] = stage_cache.cached("ingest", digest, lambda: load_demo(digest), stage)
+    else:
+        file_name = uploaded_file.name
+        with run.stage("ingest") as stage:
+            digest = session_digest(uploaded_file.file_id, uploaded_file)
+            df = stage["rows_out"] = stage_cache.cached("ingest", digest, lambda: load_csv(uploaded_file, digest), stage)
+
     parser_vod_id = parse_vod_id(file_name)
     st.success("✅ File loaded and cached!")
 
     vod_id = st.number_input("Enter VOD id here for URL purposes (if not fetched automatically from filename)", step=1, value=parser_vod_id)
 
-    # Rename Twitch export columns
-    df = df.rename({"time": "Time", "user_name": "User", "message": "Message"})
     status_container = st.status("Processing csv with given parameters...", expanded=True)
 
     # Time filtering
-    values = st.slider("Select a time range", df["Time"].min(), df["Time"].max(), (df["Time"].min(), df["Time"].max()))
-    df = df.filter(pl.col('Time') > values[0], pl.col('Time') < values[1])
+    # Time is sorted, so these are the first and last rows, and the range is cut with binary searches
+    first_second, last_second = int(df["Time"][0]), int(df["Time"][-1])
+    time_range = st.slider("Select a time range", first_second, last_second, (first_second, last_second))
 
-    # Apply filters
-    filtered_df = apply_filters(df)
+    # Apply filters and build the per-second index once per file, every window setting is derived from it
+    filters = load_filter_config()
+    filters_key = (digest, filters.fingerprint())
+    with run.stage("apply_filters", rows_in=df) as stage:
+        filtered_messages = stage["rows_out"] = stage_cache.cached("apply_filters", filters_key, lambda: prepare_messages(apply_filters(df, config=filters)), stage)
+    with run.stage("build_chat_index", rows_in=filtered_messages) as stage:
+        chat_index = stage_cache.cached("build_chat_index", filters_key, lambda: build_chat_index(filtered_messages), stage)
+        stage["rows_out"] = len(chat_index.seconds)
+    with run.stage("term_frequencies", rows_in=filtered_messages) as stage:
+        vod_terms = stage_cache.cached("term_frequencies", filters_key, lambda: term_frequencies(filtered_messages), stage)
+        stage["rows_out"] = vod_terms.counts
+    with run.stage("build_user_index", rows_in=filtered_messages) as stage:
+        users = stage_cache.cached("build_user_index", filters_key, lambda: build_user_index(filtered_messages), stage)
+        stage["rows_out"] = len(users.names)
+    with run.stage("build_term_index", rows_in=filtered_messages) as stage:
+        term_index = stage_cache.cached("build_term_index", filters_key, lambda: load_term_index(filtered_messages, digest, filters.fingerprint()), stage)
+        stage["rows_out"] = len(term_index.terms)
+    st.caption(f"{messages_in_range(chat_index, time_range).height} messages in the selected range.")
+    st.caption(f"Filters: {len(filters.bots)} bots, {len(filters.prefixes)} prefixes, {len(filters.phrases)} phrases, {len(filters.regexes)} regexes ({df.height - chat_index.messages.height} messages dropped). Edit filters.toml to change them.")
+    # Window engines return row offsets into this frame
+    messages = chat_index.messages
 
     window_type = st.radio(
         "Windowing function",
@@ -57,38 +180,186 @@ if use_demo or uploaded_file is not None:
     )    
     window_size = st.select_slider("Window size (s)", options=list(range(6, 16)), value=12)
     ignore_threshold = st.select_slider("Ignore moments with less unique users than", options=list(range(0, 11)), value=0)
+    count_mode = st.radio(
+        "Unique user counting",
+        ["Exact", "Approximate (HyperLogLog)"],
+        captions=[
+            "Counts every chatter exactly.",
+            f"Merges small per-second sketches instead, for huge chats. Typical error ±{hll_standard_error():.1%}, rarely beyond ±{3 * hll_standard_error():.1%}."
+        ], index=0, horizontal=True
+    )
 
     
     status_container.update(state='running', label='Calculating unique nicknames within given time', expanded=True)
-    perf_time_start = time.perf_counter()
-    if window_type == 'Sliding':
-        filtered_df = add_sliding_windows(filtered_df, window_size, ignore_threshold=ignore_threshold).to_pandas()
-    else:
-        filtered_df = add_tumbling_window(filtered_df, window_size, ignore_threshold=ignore_threshold).to_pandas()
-    perf_time_end = time.perf_counter()
-    status_container.update(state='running', label=f'Calculation of unique nicknames within given window took {round(perf_time_end - perf_time_start, 2)} seconds.', expanded=True)
-    filtered_df["timestamp_url"] = filtered_df["Time"].apply(lambda t: format_vod_timestamp_url(t, vod_id))
-    filtered_df['Timestamp'] = filtered_df["Time"].apply(lambda t: format_seconds_to_ts(t))
+    if count_mode != 'Exact':
+        with run.stage("build_second_sketches", rows_in=messages) as stage:
+            second_sketches = stage_cache.cached("build_second_sketches", filters_key, lambda: load_second_sketches(chat_index, digest, filters_key=filters.fingerprint()), stage)
+            stage["rows_out"] = len(chat_index.seconds)
+    def compute_windows(ignore_threshold=0, time_range=None, exact=False):
+        if (exact or count_mode == 'Exact') and window_type == 'Sliding':
+            return index_sliding_windows(chat_index, window_size, ignore_threshold=ignore_threshold, time_range=time_range)
+        if exact or count_mode == 'Exact':
+            return index_tumbling_windows(chat_index, window_size, ignore_threshold=ignore_threshold, time_range=time_range)
+        if window_type == 'Sliding':
+            return hll_sliding_windows(chat_index, second_sketches, window_size, ignore_threshold=ignore_threshold, time_range=time_range)
+        return hll_tumbling_windows(chat_index, second_sketches, window_size, ignore_threshold=ignore_threshold, time_range=time_range)
+
+    def range_windows():
+        # The demo artifact has the full-range exact windows for the default window size
+        if use_demo and count_mode == 'Exact' and ignore_threshold == 0 and time_range == (first_second, last_second):
+            prebuilt = load_demo_windows(digest, filters.fingerprint(), window_type, window_size)
+            if prebuilt is not None:
+                return prebuilt
+        return compute_windows(ignore_threshold, time_range)
+
+    windows_key = (filters_key, count_mode, window_type, window_size, ignore_threshold, time_range)
+    with run.stage("windowing", rows_in=messages) as stage:
+        filtered_df = stage["rows_out"] = stage_cache.cached("windowing", windows_key, range_windows, stage)
+    status_container.update(state='running', label=f'Calculation of unique nicknames within given window took {round(stage["seconds"], 2)} seconds.', expanded=True)
+    formatting_key = (windows_key, vod_id)
+    with run.stage("formatting", rows_in=filtered_df) as stage:
+        filtered_df = stage["rows_out"] = stage_cache.cached("formatting", formatting_key, lambda: add_timestamps(filtered_df, vod_id), stage)
 
 
     hover_info = 'In desktop, you can see chat some messages of that moment by hovering the chart. Zoom in by drawing a rectangle in any area you want. Zoom out with double-click.'
     chart_type = st.radio("Chart type", ["Bar", "Line"], index=0)
-    if chart_type == 'Bar':
+    webgl = st.toggle("Fast rendering (WebGL)", help="Draws the chart with WebGL and only sends numbers to the browser. Message previews show up when you click a point instead of on hover.")
+    max_points = st.select_slider("Max chart points", options=[500, 1000, 2000, 5000, 10000], value=CHART_MAX_POINTS)
+    if webgl:
+        hover_info = 'Click a point to see the messages of that moment and a link to the VOD. Zoom in by drawing a rectangle in any area you want. Zoom out with double-click.'
+    elif chart_type == 'Bar':
         hover_info = hover_info + ' After zooming in, you can open the VOD 30 seconds prior to that moment by clicking the URL in the bar.'
-    status_container.update(state='running', label=f'Drawing {chart_type} chart.', expanded=True)
-    fig = make_chart(filtered_df, chart_type)
-    st.info(hover_info, icon="ℹ️")
-    st.plotly_chart(fig, config={"scrollZoom": False})
+    if filtered_df.height > max_points:
+        hover_info = hover_info + f' Long ranges are reduced to at most {max_points} points, keeping every local peak. Narrow the time range for finer detail.'
+    # Chart is drawn after top peaks are known, so they are always kept when downsampling
+    chart_container = st.container()
 
     # Top peaks table
     st.subheader("Get top broadcast moments")
     SLACK = st.selectbox("Time difference between peaks (s)", (30, 45, 60, 75, 90, 120), index=5)
     TOP_N = st.selectbox("TOP N", (10, 25, 50, 100))
+    rank_by = st.radio(
+        "Top moments by", ["Volume", "Surprise"], horizontal=True,
+        help="Volume ranks windows by unique users. Surprise ranks them by how far they rise above the rolling baseline of the preceding ~10 minutes, so spikes in quiet stretches aren't crowded out by the busiest part of the stream.",
+    )
 
     status_container.update(state='running', label=f'Building table for top {TOP_N} unique nickname peaks within {window_size} seconds, at least {SLACK} seconds apart from each other.', expanded=True)
-    top_df = get_top_peaks(filtered_df, SLACK, TOP_N)
-    render_top_table(top_df)
+    peaks_key = (formatting_key, rank_by, SLACK, TOP_N)
+    if rank_by == 'Surprise':
+        # Scored from the windows already computed, messages aren't read again
+        with run.stage("add_surprise", rows_in=filtered_df) as stage:
+            filtered_df = stage["rows_out"] = stage_cache.cached("add_surprise", formatting_key, lambda: add_surprise(filtered_df), stage)
+    with run.stage("get_top_peaks", rows_in=filtered_df) as stage:
+        scores = filtered_df["Surprise" if rank_by == 'Surprise' else "UUIW"].to_numpy()
+        peak_rows = stage_cache.cached("get_top_peaks", peaks_key, lambda: select_peaks(filtered_df["Time"].to_numpy(), scores, SLACK, TOP_N), stage)
+        top_df = stage["rows_out"] = filtered_df[peak_rows]
+    with run.stage("render_top_table", rows_in=top_df) as stage:
+        render_top_table(top_df, messages, stage_cache.cached("render_top_table", peaks_key, lambda: top_table_html(top_df, messages), stage))
+        stage["rows_out"] = top_df
+    export_cols = st.columns([2, 1, 2], vertical_alignment="bottom")
+    export_format = export_cols[0].selectbox(
+        "Export format", list(EXPORT_FORMATS),
+        help="The per-second series with the top moments' ranks, links and messages, zstd-compressed. Load it with pl.read_parquet / pl.read_ipc, see export.py.",
+    )
+    # Built only when asked for, and again only after the peak settings change
+    export_key = (peaks_key, export_format)
+    if export_cols[1].button("📦 Prepare export"):
+        st.session_state["export_key"] = export_key
+    if st.session_state.get("export_key") == export_key:
+        with run.stage("export_results", rows_in=filtered_df) as stage:
+            export_data = stage_cache.cached("export_results", export_key, lambda: results_bytes(results_frame(filtered_df, peak_rows, messages, vod_id), export_format), stage)
+            stage["rows_out"] = filtered_df
+        export_cols[2].download_button(
+            "⬇️ Download results", export_data,
+            file_name=f"{file_name.rsplit('.', 1)[0]}_results.{export_format}", mime=EXPORT_FORMATS[export_format],
+        )
+    with st.expander("🔥 Most spammed words and emotes in the whole VOD"):
+        st.dataframe(vod_terms.top(50), use_container_width=True)
+    with st.expander("🔎 Keyword spikes"):
+        keyword = st.text_input("Word, emote or phrase", value=vod_terms.top(1)["Term"][0] if vod_terms.counts.height else "")
+        if keyword:
+            spikes_key = (filters_key, keyword, window_type, window_size, time_range, vod_id, SLACK, TOP_N)
+            with run.stage("keyword_spikes", rows_in=messages) as stage:
+                spikes = stage["rows_out"] = stage_cache.cached("keyword_spikes", spikes_key, lambda: add_timestamps(keyword_spikes(term_index, chat_index, keyword, window_size, SLACK, TOP_N, window_type, time_range), vod_id), stage)
+            st.caption(f"Top {TOP_N} {window_size} s windows by occurrences of \"{keyword}\", at least {SLACK} seconds apart.")
+            st.dataframe(
+                spikes.select([
+                    "Timestamp", "timestamp_url", "Count",
+                    pl.Series("💌", uuiw_messages(messages, spikes["MsgStart"].to_numpy(), spikes["MsgEnd"].to_numpy()), dtype=pl.String),
+                ]),
+                column_config={"timestamp_url": st.column_config.LinkColumn("🔗", display_text="Open VOD")},
+                use_container_width=True, hide_index=True,
+            )
+    with st.expander(f"👤 Chatters ({len(users.names)})"):
+        st.dataframe(leaderboard(users, 50), use_container_width=True, hide_index=True)
+        chatter = st.text_input("Chatter", value=users.names[0] if len(users.names) else "")
+        if chatter in users.number:
+            st.caption(f"{chatter}: messages per minute over the VOD")
+            st.bar_chart(user_activity(users, chatter, int(messages["Time"][-1])), height=150)
+            near_peaks = pl.concat([
+                user_messages(users, messages, chatter, (peak_time - 30, peak_time + 30)).with_columns(pl.lit(peak_ts).alias("Peak"))
+                for peak_time, peak_ts in top_df.select(["Time", "Timestamp"]).iter_rows()
+            ], how="vertical") if top_df.height else pl.DataFrame()
+            st.caption(f"{chatter}'s messages within 30 s of the top peaks")
+            st.dataframe(near_peaks, use_container_width=True, hide_index=True)
+        elif chatter:
+            st.caption(f"No messages from {chatter}.")
+
+    # Cross-VOD history: the whole VOD is saved with the current window settings, whatever the time range
+    st.subheader("Channel history")
+    peak_conn = open_peak_index()
+    if st.button("💾 Save this VOD to the history", disabled=not vod_id, help="Saves exact unique chatter counts for the whole VOD, whatever the count mode and time range."):
+        with run.stage("save_vod", rows_in=messages) as stage:
+            # Always exact counts: the history compares VODs by UUIW, estimates would skew it
+            full_df = stage["rows_out"] = compute_windows(exact=True)
+            save_vod(peak_conn, int(vod_id), full_df, window_type.lower(), window_size, SLACK, messages=messages.height, file_name=file_name)
+        st.success(f"Saved VOD {vod_id} ({full_df.height} seconds of chat activity).")
+    with st.expander("📚 Top moments across saved VODs"):
+        history_cols = st.columns(3)
+        last_vods = history_cols[0].number_input("Last N VODs", min_value=1, value=100, step=10)
+        history_n = history_cols[1].number_input("Top moments", min_value=1, value=50, step=10)
+        min_peak = history_cols[2].number_input("Only VODs whose peak exceeded", min_value=0, value=0, step=10)
+        st.dataframe(
+            top_moments(peak_conn, history_n, last_vods),
+            column_config={"timestamp_url": st.column_config.LinkColumn("🔗", display_text="Open VOD")},
+            use_container_width=True, hide_index=True,
+        )
+        saved_vods = list_vods(peak_conn, min_peak=min_peak)
+        st.dataframe(saved_vods, use_container_width=True, hide_index=True)
+        if saved_vods.height:
+            saved_cols = st.columns([2, 1], vertical_alignment="bottom")
+            saved_vod = saved_cols[0].selectbox("Saved VOD", saved_vods["vod_id"].to_list())
+            if saved_cols[1].button("🗑️ Remove from the history"):
+                delete_vod(peak_conn, saved_vod)
+                st.rerun()
+            st.caption(f"Saved unique chatters per second of VOD {saved_vod}")
+            st.line_chart(load_series(peak_conn, saved_vod), x="Time", y="UUIW", height=150)
+
+    status_container.update(state='running', label=f'Drawing {chart_type} chart.', expanded=True)
+    chart_rows_key = (peaks_key, chart_type, max_points)
+    with run.stage("downsampling", rows_in=filtered_df) as stage:
+        uuiw = filtered_df["UUIW"].to_numpy()
+        chart_rows = stage["rows_out"] = stage_cache.cached("downsampling", chart_rows_key, lambda: downsample_rows(uuiw, build_pyramid(uuiw), 0, len(uuiw), max_points, keep_min=chart_type == 'Line', keep_rows=peak_rows), stage)
+    chart_df = filtered_df[chart_rows]
+    with chart_container, run.stage("make_chart", rows_in=chart_rows) as stage:
+        fig = stage_cache.cached("make_chart", (chart_rows_key, webgl), lambda: make_chart(chart_df, chart_type, messages, webgl=webgl), stage)
+        st.info(hover_info, icon="ℹ️")
+        if webgl:
+            event = st.plotly_chart(fig, config={"scrollZoom": False}, on_select="rerun", selection_mode="points", key="activity_chart")
+            points = event.selection.points if event else []
+            if points:
+                timestamp, url, point_uuiw, msgs = chart_point_preview(chart_df, points[0]["point_index"], messages)
+                st.markdown(f"**{timestamp}**: {point_uuiw} unique chatters" + (f" ([open VOD]({url}))" if url else ""))
+                st.text("\n".join(msgs))
+        else:
+            st.plotly_chart(fig, config={"scrollZoom": False})
+        stage["rows_out"] = chart_rows
     status_container.update(state='complete', label='✅ All ready!', expanded=True)
+
+    if show_debug:
+        with st.expander(f"🛠️ Pipeline stages ({round(run.total_seconds(), 3)} s)", expanded=True):
+            st.dataframe(run.records, use_container_width=True)
+            st.caption(f"Stage cache: {len(stage_cache)} entries, {stage_cache.nbytes / 1024 ** 2:.1f} of {stage_cache.max_bytes / 1024 ** 2:.0f} MB, {stage_cache.hits} hits, {stage_cache.misses} misses this session.")
 else:
     st.markdown("""
     1. Insert Twitch VOD url to [twitchchatdownloader.com](https://www.twitchchatdownloader.com/), 
@@ -0,0 +1,152 @@
+"""
+Headless batch mode: top chat peaks for a whole directory of twitchchatdownloader.com CSV exports
+(or TwitchDownloader / chat-downloader JSON dumps, see json_ingest.py).
+
+    python batch.py path/to/csvs -o path/to/output --workers 8 --window-type sliding --top-n 25
+
+Writes <file name>_top.csv per VOD and summary.csv with one row per VOD.
+With --export parquet (or arrow), every VOD's windowed series and top peaks are also written
+as <file name>_results.parquet for notebooks (see export.py).
+With --index, every VOD is also saved to the cross-VOD peak index (see peak_index.py).
+Uses the same filtering, windowing and peak selection as the web app.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import polars as pl
+
+from chat_index import build_chat_index, index_sliding_windows, index_tumbling_windows
+from data_utils import apply_filters, parse_vod_id, read_chat
+from export import EXPORT_FORMATS, results_frame, write_results
+from filters import load_filter_config
+from instrumentation import PipelineRun
+from peak_index import connect, save_vod
+from processing import add_surprise, add_timestamps, prepare_messages, select_peaks, uuiw_messages
+
+SUMMARY_FILE = "summary.csv"
+
+
+def process_vod(path, output_dir, window_type="sliding", window_size=12, ignore_threshold=0, slack=120, top_n=25, index_path=None, filters_path=None, rank_by="volume", export_format=None):
+    """Analyze one CSV export or JSON dump, write its top peaks and return its summary row."""
+    file_name = os.path.basename(path)
+    vod_id = parse_vod_id(file_name)
+    summary = {"file": file_name, "vod_id": vod_id, "error": None}
+    run = PipelineRun(vod_file=file_name)
+    start = time.perf_counter()
+    try:
+        with run.stage("ingest") as stage:
+            df = stage["rows_out"] = read_chat(path)
+        with run.stage("apply_filters", rows_in=df) as stage:
+            filters = load_filter_config(filters_path) if filters_path else None
+            messages = stage["rows_out"] = prepare_messages(apply_filters(df, config=filters))
+        with run.stage("windowing", rows_in=messages) as stage:
+            index = build_chat_index(messages)
+            if window_type == "sliding":
+                windows = index_sliding_windows(index, window_size, ignore_threshold)
+            else:
+                windows = index_tumbling_windows(index, window_size, ignore_threshold)
+            stage["rows_out"] = windows
+        with run.stage("get_top_peaks", rows_in=windows) as stage:
+            if rank_by == "surprise":
+                windows = add_surprise(windows)
+            peak_rows = select_peaks(windows["Time"].to_numpy(), windows["Surprise" if rank_by == "surprise" else "UUIW"].to_numpy(), slack, top_n)
+            top_df = add_timestamps(windows[peak_rows], vod_id).with_columns(
+                pl.Series("UUIW_msgs", uuiw_messages(messages, windows["MsgStart"].to_numpy()[peak_rows], windows["MsgEnd"].to_numpy()[peak_rows]), dtype=pl.String)
+            )
+            stage["rows_out"] = top_df
+        if index_path and vod_id is not None:
+            with run.stage("save_vod", rows_in=windows) as stage:
+                conn = connect(index_path)
+                try:
+                    save_vod(conn, vod_id, windows, window_type, window_size, slack, messages=messages.height, file_name=file_name)
+                finally:
+                    conn.close()
+                stage["rows_out"] = windows
+        if export_format:
+            with run.stage("export_results", rows_in=windows) as stage:
+                write_results(results_frame(windows, peak_rows, messages, vod_id), os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}_results.{export_format}"), export_format)
+                stage["rows_out"] = windows
+        top_df = top_df.with_row_index("rank", offset=1).select(["rank", "Time", "Timestamp", "UUIW"] + (["Surprise"] if rank_by == "surprise" else []) + ["timestamp_url", "UUIW_msgs"])
+        top_df.write_csv(os.path.join(output_dir, f"{os.path.splitext(file_name)[0]}_top.csv"))
+
+        # Highest UUIW among the peaks, whichever way they were ranked
+        best = top_df.sort("UUIW", descending=True, maintain_order=True)
+        summary.update({
+            "messages": df.height,
+            "filtered_messages": messages.height,
+            "duration_s": int(df["Time"].max()) if df.height else 0,
+            "peaks": top_df.height,
+            "max_uuiw": int(best["UUIW"][0]) if best.height else 0,
+            "max_uuiw_time": best["Timestamp"][0] if best.height else None,
+            "max_uuiw_url": best["timestamp_url"][0] if best.height else None,
+        })
+    except Exception as e:
+        # One broken export shouldn't stop the whole archive
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = round(time.perf_counter() - start, 4)
+    return summary
+
+
+def run_batch(input_dir, output_dir, workers=None, **params):
+    paths = sorted(glob.glob(os.path.join(input_dir, "*.csv")) + glob.glob(os.path.join(input_dir, "*.json")))
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    summaries = []
+    if workers == 1:
+        summaries = [process_vod(path, output_dir, **params) for path in paths]
+    else:
+        # Each process gets one polars thread, parallelism comes from the pool.
+        # Spawned children inherit this before they import polars.
+        os.environ.setdefault("POLARS_MAX_THREADS", "1")
+        # polars' thread pool isn't fork-safe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            futures = [pool.submit(process_vod, path, output_dir, **params) for path in paths]
+            for future in as_completed(futures):
+                summaries.append(future.result())
+                print(f"[{len(summaries)}/{len(paths)}] {summaries[-1]['file']}", file=sys.stderr)
+
+    summary_df = pl.DataFrame(summaries, infer_schema_length=None)
+    if summary_df.height:
+        summary_df = summary_df.sort("file")
+    summary_df.write_csv(os.path.join(output_dir, SUMMARY_FILE))
+    return summary_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir", help="directory with CSV exports or JSON dumps")
+    parser.add_argument("-o", "--output-dir", default="export", help="where to write results (default: export)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--window-type", choices=["sliding", "tumbling"], default="sliding")
+    parser.add_argument("--window-size", type=int, default=12, help="window size in seconds")
+    parser.add_argument("--ignore-threshold", type=int, default=0, help="ignore windows with fewer unique users")
+    parser.add_argument("--slack", type=int, default=120, help="minimum seconds between peaks")
+    parser.add_argument("--top-n", type=int, default=25, help="peaks per VOD")
+    parser.add_argument("--rank-by", choices=["volume", "surprise"], default="volume", help="rank peaks by unique users or by surprise against the rolling baseline")
+    parser.add_argument("--export", dest="export_format", choices=list(EXPORT_FORMATS), default=None, help="also write each VOD's series and top peaks as compressed Parquet or Arrow")
+    parser.add_argument("--filters", dest="filters_path", default=None, help="filter rules TOML (default: filters.toml)")
+    parser.add_argument("--index", dest="index_path", default=None, help="also save every VOD to this peak index database")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    summary = run_batch(
+        args.input_dir, args.output_dir, args.workers,
+        window_type=args.window_type, window_size=args.window_size,
+        ignore_threshold=args.ignore_threshold, slack=args.slack, top_n=args.top_n,
+        index_path=args.index_path, filters_path=args.filters_path, rank_by=args.rank_by,
+        export_format=args.export_format,
+    )
+    elapsed = time.perf_counter() - start
+    failed = summary.filter(pl.col("error").is_not_null()).height if summary.height else 0
+    print(f"{summary.height} VODs in {elapsed:.1f}s ({failed} failed), results in {args.output_dir}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Benchmarks for the analysis pipeline on synthetic chats (see synthetic_chat.py).
+
+    python benchmark.py                          # 10k and 100k rows, compared against stored baselines
+    python benchmark.py --rows 1000000 10000000  # bigger chats
+    python benchmark.py --update-baselines       # store this machine's timings as the new baselines
+
+Every engine's output is checked against the others, and the run exits with status 1
+on a mismatch or when a timing regresses past the stored baseline.
+Cold start (fresh processes running app.py) is held to fixed budgets as well, see STARTUP_BUDGETS,
+and the prebuilt demo artifact has to match a fresh computation.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import polars as pl
+
+import cache_utils
+from chat_index import build_chat_index, index_sliding_windows, index_tumbling_windows
+from charts import make_chart
+from data_utils import apply_filters, load_csv
+from downsampling import CHART_MAX_POINTS, build_pyramid, downsample_rows
+from instrumentation import PeakRssSampler
+from processing import (
+    add_sliding_windows,
+    add_timestamps,
+    add_tumbling_window,
+    compute_sliding_windows,
+    get_top_peaks,
+    prepare_messages,
+    select_peaks,
+)
+from demo_artifact import stale_demo_artifacts
+from export import read_results, results_frame, write_results
+from json_ingest import read_chat_json
+from synthetic_chat import generate_chat, write_chat_csv, write_chat_json
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baselines.json")
+DEFAULT_ROWS = [10_000, 100_000]
+# compute_sliding_windows is O(n^2), skip it on bigger chats
+PANDAS_MAX_ROWS = 10_000
+WINDOW_SIZE = 12
+SLACK = 120
+TOP_N = 100
+# Differences below this are timer noise, never report them as regressions
+NOISE_FLOOR_S = 0.005
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# What app.py imports once a file or the demo is picked
+PIPELINE_MODULES = [
+    "cache_utils", "data_utils", "demo_artifact", "filters", "processing", "chat_index", "hll", "charts",
+    "downsampling", "tables", "stage_cache", "user_index", "peak_index", "term_counts", "term_index", "export",
+]
+# The landing page must render without these
+LANDING_EXCLUDED_MODULES = ["polars", "numpy", "pandas", "pyarrow", "wordcloud"]
+# Seconds in a fresh process, generous enough for a slow container
+STARTUP_BUDGETS = {
+    "startup: pipeline imports": 1.5,
+    "startup: landing render": 0.5,
+    "startup: demo render": 3.0,
+}
+STARTUP_SCRIPT = """
+import json, sys, time
+app_file, excluded, modules = sys.argv[1], sys.argv[2].split(","), sys.argv[3].split(",")
+if app_file == "-":
+    import streamlit
+    t = time.perf_counter()
+    for module in modules:
+        __import__(module)
+    print(json.dumps({"startup: pipeline imports": time.perf_counter() - t}))
+    sys.exit(0)
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(app_file, default_timeout=120)
+t = time.perf_counter()
+at.run()
+landing = time.perf_counter() - t
+loaded = [m for m in excluded if m in sys.modules]
+demo_toggle = [toggle for toggle in at.toggle if toggle.label == "Show demo?"][0]
+t = time.perf_counter()
+demo_toggle.set_value(True).run()
+demo = time.perf_counter() - t
+print(json.dumps({
+    "startup: landing render": landing,
+    "startup: demo render": demo,
+    "loaded": loaded,
+    "exceptions": [str(e.value) for e in at.exception],
+}))
+"""
+
+
+def measure(fn, repeat=3):
+    """Best wall time of repeat runs, peak RSS growth during the first run (None off Linux) and the result."""
+    best = float("inf")
+    result = memory = None
+    for i in range(repeat):
+        with PeakRssSampler() as sampler:
+            t = time.perf_counter()
+            result = fn()
+            best = min(best, time.perf_counter() - t)
+        if i == 0:
+            memory = sampler.peak_growth
+    return best, memory, result
+
+
+def _collapse_pandas(df):
+    out = df.groupby("Time", as_index=False)["UUIW"].max()
+    return pl.from_pandas(out).with_columns(pl.col("Time").cast(pl.Int64), pl.col("UUIW").cast(pl.Int64))
+
+
+def run_size(n_rows, repeat, tmp_dir):
+    results, errors = [], []
+
+    def bench(name, fn, runs=repeat):
+        seconds, memory, result = measure(fn, runs)
+        results.append({"name": name, "rows": n_rows, "seconds": seconds, "peak_mem_bytes": memory})
+        return result
+
+    def check(ok, what):
+        if not ok:
+            errors.append(f"{what} ({n_rows} rows)")
+
+    chat = generate_chat(n_rows, seed=n_rows)
+    csv_path = os.path.join(tmp_dir, f"twitch-chat-{n_rows}.csv")
+    write_chat_csv(chat, csv_path)
+
+    def load_cold():
+        for name in os.listdir(cache_utils.CACHE_DIR) if os.path.isdir(cache_utils.CACHE_DIR) else []:
+            os.remove(os.path.join(cache_utils.CACHE_DIR, name))
+        return load_csv(csv_path)
+
+    loaded = bench("load_csv", load_cold)
+    loaded_cached = bench("load_csv (cached)", lambda: load_csv(csv_path))
+    expected = chat.with_columns(pl.col("User").cast(pl.String))
+    for frame in (loaded, loaded_cached):
+        check(frame.with_columns(pl.col("User").cast(pl.String)).equals(expected), "load_csv output differs from generated chat")
+
+    for layout in ("twitchdownloader", "chat-downloader"):
+        json_path = os.path.join(tmp_dir, f"twitch-chat-{n_rows}.{layout}.json")
+        write_chat_json(chat, json_path, layout)
+        parsed = bench(f"read_chat_json ({layout})", lambda: read_chat_json(json_path))
+        # Parse throughput over the dump's size, the number to quote for archive tooling
+        results[-1]["mb_per_s"] = os.path.getsize(json_path) / 2 ** 20 / results[-1]["seconds"]
+        check(parsed.with_columns(pl.col("User").cast(pl.String)).equals(expected), f"read_chat_json ({layout}) output differs from generated chat")
+        os.remove(json_path)
+
+    messages = prepare_messages(apply_filters(loaded))
+    sliding = bench("add_sliding_windows", lambda: add_sliding_windows(messages, WINDOW_SIZE))
+    tumbling = bench("add_tumbling_window", lambda: add_tumbling_window(messages, WINDOW_SIZE))
+
+    index = bench("build_chat_index", lambda: build_chat_index(messages))
+    index_sliding = bench("index_sliding_windows", lambda: index_sliding_windows(index, WINDOW_SIZE))
+    index_tumbling = bench("index_tumbling_windows", lambda: index_tumbling_windows(index, WINDOW_SIZE))
+    check(index_sliding.equals(sliding), "index_sliding_windows differs from add_sliding_windows")
+    check(index_tumbling.equals(tumbling), "index_tumbling_windows differs from add_tumbling_window")
+
+    if n_rows <= PANDAS_MAX_ROWS:
+        pandas_df = messages.select(["Time", "User", "Message"]).to_pandas()
+        # The O(n^2) pandas original is the correctness oracle only, its runtime isn't tracked
+        reference = compute_sliding_windows(pandas_df.copy(), WINDOW_SIZE)
+        check(_collapse_pandas(reference).equals(sliding.select(["Time", "UUIW"])),
+              "add_sliding_windows differs from compute_sliding_windows")
+
+    for label, windows in (("sliding", sliding), ("tumbling", tumbling)):
+        peaks = bench(f"get_top_peaks ({label})", lambda: get_top_peaks(windows, SLACK, TOP_N))
+        times = np.sort(peaks["Time"].to_numpy())
+        check(len(peaks) <= TOP_N and bool(np.all(np.diff(times) > SLACK)),
+              f"get_top_peaks ({label}) returned peaks closer than SLACK")
+        check(peaks["UUIW"].max() == windows["UUIW"].max(), f"get_top_peaks ({label}) missed the highest window")
+
+    # Export round trip: what a notebook loads has to be what was written
+    export_path = os.path.join(tmp_dir, f"results-{n_rows}.parquet")
+    exported = results_frame(sliding, select_peaks(sliding["Time"].to_numpy(), sliding["UUIW"].to_numpy(), SLACK, TOP_N), messages, 123456789)
+    bench("write_results (parquet)", lambda: write_results(exported, export_path))
+    check(bench("read_results (parquet)", lambda: read_results(export_path)).equals(exported), "read_results differs from the written results")
+
+    windows = add_timestamps(sliding, 123456789)
+
+    def chart():
+        uuiw = windows["UUIW"].to_numpy()
+        rows = downsample_rows(uuiw, build_pyramid(uuiw), 0, len(uuiw), CHART_MAX_POINTS, keep_min=False)
+        return make_chart(windows[rows], "Bar", messages)
+
+    fig = bench("make_chart", chart)
+    check(max(fig.data[0].y) == windows["UUIW"].max(), "make_chart dropped the highest window")
+    return results, errors
+
+
+def run_startup(repeat, tmp_dir):
+    """Cold start timings, each run in a fresh process with an empty chat cache. Best of repeat."""
+    results, errors = [], []
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [os.path.dirname(APP_FILE), os.environ.get("PYTHONPATH")])),
+        CHAT_CACHE_DIR=os.path.join(tmp_dir, "startup-cache"),
+        CHAT_PEAK_INDEX=os.path.join(tmp_dir, "startup-peaks.sqlite"),
+    )
+    best = {}
+    for _ in range(repeat):
+        for app_file in ("-", APP_FILE):
+            out = subprocess.run(
+                [sys.executable, "-c", STARTUP_SCRIPT, app_file, ",".join(LANDING_EXCLUDED_MODULES), ",".join(PIPELINE_MODULES)],
+                cwd=os.path.dirname(APP_FILE), env=env, capture_output=True, text=True,
+            )
+            if out.returncode != 0:
+                errors.append(f"startup run failed: {out.stderr.strip().splitlines()[-1:]}")
+                continue
+            timings = json.loads(out.stdout.strip().splitlines()[-1])
+            loaded = timings.pop("loaded", [])
+            if loaded:
+                errors.append(f"landing page imported {', '.join(loaded)}")
+            errors += [f"app raised {e}" for e in timings.pop("exceptions", [])]
+            for name, seconds in timings.items():
+                best[name] = min(best.get(name, float("inf")), seconds)
+    for name, seconds in best.items():
+        results.append({"name": name, "rows": 0, "seconds": seconds, "peak_mem_bytes": None})
+        if seconds > STARTUP_BUDGETS[name]:
+            errors.append(f"{name} took {seconds:.3f}s, budget {STARTUP_BUDGETS[name]}s")
+    return results, sorted(set(errors))
+
+
+def compare(results, baselines, tolerance):
+    regressions = []
+    for r in results:
+        key = f"{r['name']}@{r['rows']}"
+        base = baselines.get(key)
+        if base is None:
+            continue
+        if r["seconds"] > base * (1 + tolerance) and r["seconds"] - base > NOISE_FLOOR_S:
+            regressions.append(f"{key}: {r['seconds']:.4f}s vs baseline {base:.4f}s")
+    return regressions
+
+
+def print_results(results, baselines):
+    print(f"{'benchmark':<32}{'rows':>12}{'seconds':>12}{'baseline':>12}{'peak MB':>10}")
+    for r in results:
+        base = baselines.get(f"{r['name']}@{r['rows']}")
+        mem = "" if r["peak_mem_bytes"] is None else f"{r['peak_mem_bytes'] / 2 ** 20:.1f}"
+        base = "" if base is None else f"{base:.4f}"
+        print(f"{r['name']:<32}{r['rows']:>12}{r['seconds']:>12.4f}{base:>12}{mem:>10}")
+    for r in results:
+        if "mb_per_s" in r:
+            print(f"{r['name']} on {r['rows']} rows: {r['mb_per_s']:.1f} MB/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="chat sizes to generate")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark, the best one counts")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown over baseline, 0.5 = 50%%")
+    parser.add_argument("--update-baselines", action="store_true", help="store these timings as baselines")
+    parser.add_argument("--json", help="also write results to this file as JSON lines")
+    parser.add_argument("--skip-startup", action="store_true", help="don't measure cold start of the app")
+    args = parser.parse_args(argv)
+
+    baselines = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE) as f:
+            baselines = json.load(f)
+
+    results, errors = [], []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_utils.CACHE_DIR = os.path.join(tmp_dir, "cache")
+        # Plotly loads its trace validators on first use, keep that out of the first timed size
+        run_size(1000, 1, tmp_dir)
+        for n_rows in args.rows:
+            size_results, size_errors = run_size(n_rows, args.repeat, tmp_dir)
+            results += size_results
+            errors += size_errors
+        # The prebuilt demo windows must be what the engines compute now
+        errors += [f"demo artifact {kind} differs from a fresh computation, rebuild it with demo_artifact.py" for kind in stale_demo_artifacts()]
+        startup_errors = []
+        if not args.skip_startup:
+            startup_results, startup_errors = run_startup(args.repeat, tmp_dir)
+            results += startup_results
+
+    print_results(results, baselines)
+    if args.json:
+        with open(args.json, "w") as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+    if args.update_baselines:
+        baselines.update({f"{r['name']}@{r['rows']}": round(r["seconds"], 6) for r in results})
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(dict(sorted(baselines.items())), f, indent=2)
+            f.write("\n")
+        print(f"Baselines written to {BASELINE_FILE}")
+        regressions = []
+    else:
+        regressions = compare(results, baselines, args.tolerance)
+
+    for line in errors:
+        print(f"MISMATCH {line}")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    for line in startup_errors:
+        print(f"STARTUP {line}")
+    return 1 if errors or regressions or startup_errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import polars as pl
+
+# Parsed chats are stored as uncompressed Arrow IPC so later loads can memory-map them
+CACHE_DIR = os.environ.get(
+    "CHAT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "chats"),
+)
+CACHE_MAX_BYTES = int(os.environ.get("CHAT_CACHE_MAX_BYTES", 1024 ** 3))
+CACHE_SUFFIX = ".arrow"
+# Derived arrays (e.g. HyperLogLog sketches) cached next to the parsed chats, also memory-mapped
+ARRAY_SUFFIX = ".npy"
+# Bump when the cached frame layout or what is computed into it (window engines, tokenization) changes, old entries then just
+# age out (the demo artifact is named after it too, rebuild it with demo_artifact.py)
+CACHE_VERSION = 3
+
+
+def file_digest(file, chunk_size=1024 * 1024):
+    """Content hash of a path or a file-like object (e.g. Streamlit UploadedFile)."""
+    h = hashlib.blake2b(digest_size=16)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+    else:
+        pos = file.tell()
+        file.seek(0)
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            h.update(chunk)
+        file.seek(pos)
+    return h.hexdigest()
+
+
+def cache_path(digest, kind="chat", suffix=CACHE_SUFFIX):
+    return os.path.join(CACHE_DIR, f"{digest}.{kind}.v{CACHE_VERSION}{suffix}")
+
+
+def load_cached_frame(digest, kind="chat"):
+    """Memory-mapped frame for digest, or None if it isn't cached."""
+    path = cache_path(digest, kind)
+    if not os.path.exists(path):
+        return None
+    try:
+        df = pl.read_ipc(path, memory_map=True)
+    except Exception:
+        # Half-written or corrupt entry, parse again
+        _remove(path)
+        return None
+    # mtime is the LRU clock
+    os.utime(path)
+    return df
+
+
+def _publish(path, write):
+    """
+    write(tmp_path) into a fresh temporary file, then move it to path in one step. Streamlit sessions
+    are threads of one process, so the temporary name has to be unique per call, not per process.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, prefix=os.path.basename(path) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _remove(tmp_path)
+        raise
+    evict_cache(keep=path)
+
+
+def store_cached_frame(digest, df: pl.DataFrame, kind="chat"):
+    # Plain Arrow string/dictionary layout, polars' string views don't round-trip through memory-mapped IPC
+    _publish(cache_path(digest, kind), lambda tmp_path: df.write_ipc(tmp_path, compression="uncompressed", compat_level=pl.CompatLevel.oldest()))
+
+
+def load_cached_array(digest, kind):
+    """Read-only memory-mapped array for digest, or None if it isn't cached."""
+    path = cache_path(digest, kind, ARRAY_SUFFIX)
+    if not os.path.exists(path):
+        return None
+    try:
+        array = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        _remove(path)
+        return None
+    os.utime(path)
+    return array
+
+
+def store_cached_array(digest, array, kind):
+    def write(tmp_path):
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+    _publish(cache_path(digest, kind, ARRAY_SUFFIX), write)
+
+
+def evict_cache(max_bytes=None, keep=None):
+    """Delete least recently used entries until the cache fits in max_bytes."""
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CACHE_DIR):
+        return
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        path = os.path.join(CACHE_DIR, name)
+        if name.endswith((CACHE_SUFFIX, ARRAY_SUFFIX)) and os.path.isfile(path):
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep:
+            continue
+        if _remove(path):
+            total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except OSError:
+        # Still memory-mapped somewhere (Windows), try again on the next eviction
+        return False
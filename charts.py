@@ -1,32 +1,44 @@
+import numpy as np
 import plotly.graph_objects as go
+import polars as pl
 
-def make_chart(df, chart_type):
+from processing import message_peeks, window_messages
+
+def make_chart(df: pl.DataFrame, chart_type, messages=None, webgl=False):
+    if webgl:
+        return make_webgl_chart(df, chart_type)
+    # Previews are only built for the rows that end up in the chart (live mode has no messages to show)
+    if messages is not None:
+        peeks = message_peeks(messages, df["MsgStart"].to_numpy(), df["MsgEnd"].to_numpy())
+        hovertemplate = "Unique chatters: %{y}<br>Message preview:<br>%{customdata}"
+    else:
+        peeks, hovertemplate = None, "Unique chatters: %{y}"
     if chart_type == "Line":
         fig = go.Figure(
             data=[
                 go.Scatter(
                     name="",
-                    x=df["Time"],
-                    y=df["UUIW"],
-                    hovertemplate="Unique chatters: %{y}<br>Message preview:<br>%{customdata}",
-                    customdata=df["MessagePeek"].str.split("<br>").str[:50].str.join("<br>"),
+                    x=df["Time"].to_numpy(),
+                    y=df["UUIW"].to_numpy(),
+                    hovertemplate=hovertemplate,
+                    customdata=peeks,
                     mode="lines",
                     line=dict(width=1)
                 )
             ]
         )
     elif chart_type == "Bar":
+        links = df.select(
+            pl.format("<a href='{}' target='_blank'>🔗🔗🔗🔗</a>", pl.col("timestamp_url").fill_null("None"))
+        ).to_series()
         fig = go.Figure(
             go.Bar(
                 name="",
-                x=df["Timestamp"].astype('string'),
-                y=df["UUIW"],
-                hovertemplate="Unique chatters: %{y}<br>Message preview:<br>%{customdata}",
-                customdata=df["MessagePeek"].str.split("<br>").str[:50].str.join("<br>"),
-                text=[
-                    f"<a href='{url}' target='_blank'>🔗🔗🔗🔗</a>"
-                    for url in df["timestamp_url"]
-                ],
+                x=df["Timestamp"].to_list(),
+                y=df["UUIW"].to_numpy(),
+                hovertemplate=hovertemplate,
+                customdata=peeks,
+                text=links.to_list(),
                 textposition="outside",
                 marker_color="purple"
             )
@@ -34,3 +46,36 @@ def make_chart(df, chart_type):
         fig.update_layout(barmode="overlay")
     fig.update_layout(hovermode="x unified", height=750)
     return fig
+
+
+def make_webgl_chart(df: pl.DataFrame, chart_type):
+    """
+    Lightweight version of make_chart: one WebGL trace holding only numeric columns, which
+    plotly sends as base64 typed arrays (no per-point previews or link strings).
+    Previews are looked up when a point is clicked, see chart_point_preview.
+    """
+    # Milliseconds on a date axis, so ticks and hover read as clock time (fits int32 up to 596 hours)
+    x = df["Time"].to_numpy().astype(np.int32) * np.int32(1000)
+    y = df["UUIW"].to_numpy().astype(np.int32)
+    line = dict(width=1, shape="hv" if chart_type == "Bar" else "linear", color="purple" if chart_type == "Bar" else None)
+    fig = go.Figure(
+        go.Scattergl(
+            name="",
+            x=x,
+            y=y,
+            hovertemplate="%{x|%H:%M:%S}<br>Unique chatters: %{y}<br>Click for messages",
+            mode="lines+markers",
+            marker=dict(size=4, opacity=0),
+            line=line,
+            # Step area reads like the bar chart without one SVG element per bar
+            fill="tozeroy" if chart_type == "Bar" else None,
+        )
+    )
+    fig.update_layout(hovermode="closest", height=750, xaxis=dict(type="date", tickformat="%H:%M:%S"))
+    return fig
+
+def chart_point_preview(df: pl.DataFrame, row, messages, max_msgs=50):
+    """Timestamp, link and message preview of one clicked chart row (df as given to make_chart)."""
+    start, end = int(df["MsgStart"][row]), int(df["MsgEnd"][row])
+    msgs = window_messages(messages, [start], [end], limit=max_msgs)[0]
+    return df["Timestamp"][row], df["timestamp_url"][row], int(df["UUIW"][row]), msgs
@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+
+import numpy as np
+import polars as pl
+
+from processing import prepare_messages
+
+# Sentinel for "user has no earlier message", far enough back to never overlap a window
+NO_PREV_TIME = np.iinfo(np.int64).min // 4
+
+@dataclass
+class ChatIndex:
+    """
+    Per-second intermediate built once per loaded (and filtered) chat.
+    Every window size and window type is derived from these arrays without touching the messages again.
+    """
+    messages: pl.DataFrame      # prepare_messages() frame, MsgStart/MsgEnd point into it
+    time: np.ndarray            # Time per row, sorted
+    prev_row: np.ndarray        # row of the same user's previous message, -1 if none
+    prev_time: np.ndarray       # Time of the same user's previous message, NO_PREV_TIME if none
+    seconds: np.ndarray         # distinct seconds that have messages
+    second_start: np.ndarray    # first row of each distinct second, plus a final len(messages)
+
+def build_chat_index(df: pl.DataFrame) -> ChatIndex:
+    if "PrevUserRow" not in df.columns:
+        df = prepare_messages(df)
+
+    time = df["Time"].to_numpy().astype(np.int64)
+    prev_row = df["PrevUserRow"].to_numpy().astype(np.int64)
+    prev_time = np.where(prev_row >= 0, time[np.maximum(prev_row, 0)], NO_PREV_TIME)
+
+    if len(time):
+        boundaries = np.flatnonzero(np.diff(time)) + 1
+        second_start = np.concatenate(([0], boundaries, [len(time)]))
+    else:
+        second_start = np.zeros(1, dtype=np.int64)
+    seconds = time[second_start[:-1]]
+
+    return ChatIndex(df, time, prev_row, prev_time, seconds, second_start)
+
+def row_range(index: ChatIndex, time_range=None):
+    """Rows [r0, r1) and distinct seconds [k0, k1) inside an inclusive (start, end) time range."""
+    if time_range is None:
+        return 0, len(index.time), 0, len(index.seconds)
+    start, end = time_range
+    k0 = int(np.searchsorted(index.seconds, start, "left"))
+    k1 = max(int(np.searchsorted(index.seconds, end, "right")), k0)
+    return int(index.second_start[k0]), int(index.second_start[k1]), k0, k1
+
+def first_row_at(index: ChatIndex, times):
+    """First row with Time >= t for each t, searched in the distinct seconds rather than every row."""
+    return index.second_start[np.searchsorted(index.seconds, times, "left")]
+
+def window_rows(starts, ends):
+    """Row offsets of the windows [starts[i], ends[i]) laid end to end, and which window each row belongs to."""
+    starts = np.asarray(starts, dtype=np.int64)
+    lengths = np.maximum(np.asarray(ends, dtype=np.int64) - starts, 0)
+    rows = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return rows, np.repeat(np.arange(len(starts)), lengths)
+
+def messages_in_range(index: ChatIndex, time_range=None) -> pl.DataFrame:
+    """Messages inside an inclusive time range, a zero-copy slice of index.messages."""
+    r0, r1, _, _ = row_range(index, time_range)
+    return index.messages.slice(r0, r1 - r0)
+
+def windows_frame(times, uuiw, starts, ends, ignore_threshold):
+    df = pl.DataFrame(
+        {"Time": times, "UUIW": uuiw, "MsgStart": starts, "MsgEnd": ends},
+        schema={"Time": pl.Int64, "UUIW": pl.Int64, "MsgStart": pl.Int64, "MsgEnd": pl.Int64},
+    )
+    return df.filter(pl.col("UUIW") >= ignore_threshold)
+
+def index_sliding_windows(index: ChatIndex, window_size: int, ignore_threshold: int = 0, time_range=None) -> pl.DataFrame:
+    """
+    Same output as processing.add_sliding_windows, restricted to an inclusive time_range.
+    A message at second s whose author last spoke at p is counted for every window end
+    in [max(s, p + window_size + 1), s + window_size]; summing those intervals with a
+    difference array gives UUIW for every second in one vectorized pass.
+    """
+    r0, r1, k0, k1 = row_range(index, time_range)
+    if r0 == r1:
+        return windows_frame([], [], [], [], ignore_threshold)
+
+    time = index.time[r0:r1]
+    # Messages before the selected range don't count, so neither do their authors' earlier visits
+    prev_time = np.where(index.prev_row[r0:r1] >= r0, index.prev_time[r0:r1], NO_PREV_TIME)
+
+    origin = time[0]
+    first = np.maximum(time, prev_time + window_size + 1) - origin
+    last = time + window_size - origin
+    keep = first <= last
+    size = last[-1] + 2
+    diff = np.bincount(first[keep], minlength=size) - np.bincount(last[keep] + 1, minlength=size)
+    active = np.cumsum(diff)
+
+    seconds = index.seconds[k0:k1]
+    uuiw = active[seconds - origin]
+    starts = np.maximum(first_row_at(index, seconds - window_size), r0)
+    ends = index.second_start[k0 + 1:k1 + 1]
+    return windows_frame(seconds, uuiw, starts, ends, ignore_threshold)
+
+def index_tumbling_windows(index: ChatIndex, window_size: int, ignore_threshold: int = 0, time_range=None) -> pl.DataFrame:
+    """
+    Same output as processing.add_tumbling_window, restricted to an inclusive time_range.
+    A row is a user's first message in its window when their previous row is before the window start.
+    """
+    r0, r1, _, _ = row_range(index, time_range)
+    if r0 == r1:
+        return windows_frame([], [], [], [], ignore_threshold)
+
+    window_id = index.time[r0:r1] // window_size
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(window_id)) + 1))
+    lengths = np.diff(np.append(starts, len(window_id)))
+    row_window_start = np.repeat(starts + r0, lengths)
+    first_in_window = index.prev_row[r0:r1] < row_window_start
+
+    uuiw = np.add.reduceat(first_in_window.astype(np.int64), starts)
+    return windows_frame(window_id[starts] * window_size, uuiw, starts + r0, starts + lengths + r0, ignore_threshold)
@@ -1,11 +1,21 @@
 import pandas as pd
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from wordcloud import WordCloud
 import plotly.offline as pyo
 import sys
 import os
-import fetch_vod_chat
+import polars as pl
+
+from export import results_frame, write_results
+from processing import prepare_messages, select_peaks, sliding_window_uuiw
+from term_counts import count_terms
+from user_index import build_user_index, leaderboard
+
+try:
+    import fetch_vod_chat
+except ImportError:
+    # Downloader isn't part of this repo, CSVs have to be in the import folder already
+    fetch_vod_chat = None
 
 # Currently eats csv files created by https://www.twitchchatdownloader.com/
 # Download VOD Chat export, rename it to [vodid].csv, i.e. 1828948529.csv and
@@ -31,6 +41,13 @@ def write_csv_file(df, vod_id, type):
     df.to_csv(file_path + f'_{type}.csv', encoding='utf-8', sep=',', index=False)
     return df
 
+# Write the UUIW series and top peaks with their messages as zstd Parquet (see export.py)
+def write_results_file(windows, peak_rows, messages, vod_id):
+    folder_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'export')
+    file_path = os.path.join(folder_path, vod_id) + '_results.parquet'
+    write_results(results_frame(windows, peak_rows, messages, vod_id), file_path)
+    return file_path
+
 # Apply filters to the DataFrame
 def apply_filters(df, filter_replies=True):
     # Filter out rows with user_name "nightbot"
@@ -67,19 +84,16 @@ def group_rows_into_windows(df):
     return grouped_df
 
 def get_highscores(df):
-    highscore_df = df.groupby('user_name').agg({
-        'message_count': 'count',
-        'message': 'nunique'
-    }).reset_index().sort_values(by='message_count', ascending=False)
-    return highscore_df
+    # Counts come precomputed from the per-user index, already in leaderboard order
+    messages = pl.from_pandas(df[['time', 'user_name', 'message']].astype({'user_name': str})).rename({'time': 'Time', 'user_name': 'User', 'message': 'Message'})
+    users = build_user_index(messages)
+    return leaderboard(users, len(users.names)).rename({'User': 'user_name', 'Messages': 'message_count', 'DistinctMessages': 'message'}).to_pandas()
 
 def get_wordcounts(df):
-    wordcloud_df = df['message'].str.split()
-    wordcloud_df = wordcloud_df.explode('message')
-    wordcloud_df = wordcloud_df.str.replace('[\,\?\!\"]', '', regex=True)
-    wordcloud_df = wordcloud_df.str.lower()
-    # wordcloud_df = wordcloud_df.apply(leave_unique_words, axis=1) # TO-DO korjaa tää käyttökelposeks
-    return wordcloud_df.value_counts().to_dict()
+    # Exact word counts, most common first. term_counts.term_frequencies is the bounded, approximate
+    # version the app uses for whole VODs
+    messages = pl.from_pandas(df[['message']].fillna('').astype(str)).rename({'message': 'Message'})
+    return dict(count_terms(messages).sort(['Count', 'Term'], descending=[True, False]).iter_rows())
 
 # Convert seconds to correct format for Twitch VOD timestamp, i.e. 00h01m00s
 def format_vod_timestamp(seconds):
@@ -125,7 +139,8 @@ def drawFigure(df, x_column, y_column, highscore_df, wordcloud_dict):
         type='table'
     )])
 
-    # Generate the word cloud
+    # Generate the word cloud (wordcloud is slow to import and only needed here)
+    from wordcloud import WordCloud
     wordcloud = WordCloud(width=800, height=400).generate_from_frequencies(wordcloud_dict)
     # Convert the word cloud to a Plotly trace
     wordcloud_fig = go.Figure(data=[go.Image(z=wordcloud.to_array())])
@@ -160,6 +175,8 @@ if __name__ == "__main__":
     csv_filename = vod_id + '.csv'
     if os.path.isfile(f'{os.path.dirname(os.path.abspath(__file__))}/import/{csv_filename}'):
         df = read_csv_file(csv_filename)
+    elif fetch_vod_chat is None:
+        quit(f'import/{csv_filename} not found (for whole folders of exports, see batch.py)')
     else:
         status = fetch_vod_chat.download_chat_log(vod_id)
         if status == True:
@@ -173,10 +190,12 @@ if __name__ == "__main__":
     # Apply filters to the DataFrame
     filtered_df = apply_filters(df, filter_replies=True)
     rolling_df = filtered_df
-    rolling_df["unique_users_in_window"] = [
-        rolling_df.loc[(filtered_df["time"] >= t - WINDOW_SIZE) & (rolling_df["time"] <= t), "user_name"].nunique()
-        for t in rolling_df["time"]
-    ]
+    # Unique users in [t - WINDOW_SIZE, t] for every row, one linear pass instead of a scan per row
+    parsed_messages = prepare_messages(
+        pl.from_pandas(rolling_df[['time', 'user_name', 'message']]).rename({'time': 'Time', 'user_name': 'User', 'message': 'Message'})
+    )
+    uuiw = sliding_window_uuiw(parsed_messages, WINDOW_SIZE)
+    rolling_df["unique_users_in_window"] = rolling_df["time"].map(dict(zip(uuiw["Time"], uuiw["UUIW"])))
     # TO-DO tee joku systeemi että tästä saa ulos sekä tään viivagraafin rullaavalla että palikkagraafin staattisilla
     replies_included_df = apply_filters(df, filter_replies=False)
 
@@ -198,6 +217,8 @@ if __name__ == "__main__":
 
     top_windows_df = grouped_df.nlargest(top_n_pct_row_amount, 'user_name').sort_values('window')
     write_csv_file(top_windows_df[['user_name', 'message_count', 'timestamp_url', 'message']], vod_id, 'top')
+    # Same number of peaks as the top csv, picked from the sliding series at least a window apart
+    write_results_file(uuiw, select_peaks(uuiw["Time"].to_numpy(), uuiw["UUIW"].to_numpy(), WINDOW_SIZE, top_n_pct_row_amount), parsed_messages, vod_id)
     # print('top_windows_df: ', top_windows_df) # debug
 
     grouped_df['timestamp_dt'] = pd.to_datetime(grouped_df['window'], unit='s').dt.time
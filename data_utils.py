@@ -1,9 +1,11 @@
-import pandas as pd
 import polars as pl
-import streamlit as st
 import os
 import re
 
+from cache_utils import file_digest, load_cached_frame, store_cached_frame
+from filters import filter_messages, load_filter_config
+from json_ingest import is_json_export, read_chat_json
+
 # def apply_filters(df, filter_replies=True):
 #     df = df[df["User"] != "nightbot"]
 #     if filter_replies:
@@ -12,13 +14,12 @@ import re
 #         df = df[~df["Message"].str.startswith(("!"), na=False)]
 #     return df
 
-def apply_filters(df, filter_replies=True):
-    df = df.filter(pl.col('User') != 'nightbot')
-    if filter_replies:
-        df = df.filter(~(pl.col("Message").str.starts_with("!") | pl.col("Message").str.starts_with("@")))
-    else:
-        df = df.filter(~(pl.col("Message").str.starts_with("!")))
-    return df
+def apply_filters(df, filter_replies=True, config=None):
+    """Drop bots, commands (and replies) and blocked messages, rules from filters.toml (see filters.py)."""
+    config = config or load_filter_config()
+    if not filter_replies:
+        config = config.without_replies()
+    return filter_messages(df, config)
 
 
 def parse_vod_id(filename):
@@ -30,6 +31,52 @@ def parse_vod_id(filename):
 # def load_csv(file):
 #     return pd.read_csv(file, encoding="utf-8", on_bad_lines="skip")
 
-@st.cache_data
-def load_csv(file) -> pl.DataFrame:
-    return pl.read_csv(file, encoding="utf8-lossy", truncate_ragged_lines=True)
+def load_csv(file, digest=None) -> pl.DataFrame:
+    """
+    Load a twitchchatdownloader.com export (or a JSON dump, see json_ingest.py) as a Time/User/Message frame.
+    Parsed frames are cached on disk by content hash, so re-opening a file
+    (or restarting the server) memory-maps the cached copy instead of parsing again.
+    """
+    digest = digest or file_digest(file)
+    df = load_cached_frame(digest)
+    if df is None:
+        if not isinstance(file, (str, os.PathLike)):
+            file.seek(0)
+        df = read_chat(file)
+        store_cached_frame(digest, df)
+    return ensure_sorted(df)
+
+# Only the columns we use, with fixed dtypes (user_color is never read)
+CHAT_CSV_SCHEMA = {"time": pl.Int32, "user_name": pl.Categorical, "message": pl.String}
+CHAT_COLUMNS = {"time": "Time", "user_name": "User", "message": "Message"}
+
+def read_chat_csv(source) -> pl.DataFrame:
+    """
+    Parse a twitchchatdownloader.com export with a fixed schema.
+    Users are dictionary-encoded, so User.to_physical() gives compact integer ids.
+    """
+    df = pl.read_csv(
+        source,
+        columns=list(CHAT_CSV_SCHEMA),
+        schema_overrides=CHAT_CSV_SCHEMA,
+        encoding="utf8-lossy",
+        truncate_ragged_lines=True,
+    )
+    return ensure_sorted(df.rename(CHAT_COLUMNS).select(list(CHAT_COLUMNS.values())))
+
+def read_chat(source) -> pl.DataFrame:
+    """read_chat_csv or read_chat_json, by what the file (path or binary file-like) starts with."""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            head = f.read(64)
+    else:
+        pos = source.tell()
+        head = source.read(64)
+        source.seek(pos)
+    return read_chat_json(source) if is_json_export(head) else read_chat_csv(source)
+
+def ensure_sorted(df: pl.DataFrame) -> pl.DataFrame:
+    """Sort by Time if needed and flag the column as sorted so later checks and searches are O(1)/O(log n)."""
+    if not df["Time"].is_sorted():
+        df = df.sort("Time", maintain_order=True)
+    return df.with_columns(pl.col("Time").set_sorted())
@@ -0,0 +1,98 @@
+"""
+Prebuilt demo data, so a fresh server shows the demo without parsing the CSV or windowing it.
+
+    python demo_artifact.py            # rebuild after changing the demo CSV, filters.toml or the window engines
+    python demo_artifact.py --check    # exit 1 if the artifact differs from a fresh computation
+
+demo/ holds the parsed frame and the full-range exact windows for the default window size,
+named after the CSV's content hash, the filters' fingerprint and cache_utils.CACHE_VERSION.
+A stale artifact is simply not found, and the app falls back to parsing. Engine changes don't
+show up in the name unless CACHE_VERSION is bumped, benchmark.py runs the check to catch that.
+"""
+import os
+import sys
+
+import polars as pl
+
+from cache_utils import CACHE_VERSION, file_digest
+from chat_index import build_chat_index, index_sliding_windows, index_tumbling_windows
+from data_utils import apply_filters, ensure_sorted, load_csv, read_chat
+from filters import load_filter_config
+from processing import prepare_messages
+
+DEMO_FILE = "twitch-chat-2587926699.csv"
+DEMO_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), DEMO_FILE)
+DEMO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo")
+DEMO_WINDOW_SIZE = 12
+
+
+def artifact_path(digest, kind, demo_dir=DEMO_DIR):
+    return os.path.join(demo_dir, f"{digest}.{kind}.v{CACHE_VERSION}.arrow")
+
+
+def windows_kind(filters_key, window_type, window_size):
+    return f"windows-{filters_key}-{window_type.lower()}-{window_size}"
+
+
+def _read(path):
+    return pl.read_ipc(path, memory_map=True) if os.path.exists(path) else None
+
+
+def load_demo(digest, demo_dir=DEMO_DIR) -> pl.DataFrame:
+    """The demo chat from the artifact, parsed from DEMO_FILE (and disk-cached) if there is none for digest."""
+    df = _read(artifact_path(digest, "chat", demo_dir))
+    return ensure_sorted(df) if df is not None else load_csv(DEMO_PATH, digest)
+
+
+def load_demo_windows(digest, filters_key, window_type, window_size, demo_dir=DEMO_DIR):
+    """Prebuilt full-range exact windows, or None when they weren't built for these settings."""
+    return _read(artifact_path(digest, windows_kind(filters_key, window_type, window_size), demo_dir))
+
+
+def _values(df):
+    # Categoricals from different string caches never compare equal
+    return df.with_columns(pl.col(pl.Categorical).cast(pl.String))
+
+
+def demo_frames(window_size=DEMO_WINDOW_SIZE):
+    """The demo's parsed frame and default windows computed from scratch, by artifact kind."""
+    df = ensure_sorted(read_chat(DEMO_PATH))
+    filters = load_filter_config()
+    index = build_chat_index(prepare_messages(apply_filters(df, config=filters)))
+    return {
+        "chat": df,
+        windows_kind(filters.fingerprint(), "Sliding", window_size): index_sliding_windows(index, window_size),
+        windows_kind(filters.fingerprint(), "Tumbling", window_size): index_tumbling_windows(index, window_size),
+    }
+
+
+def build_demo_artifact(demo_dir=DEMO_DIR, window_size=DEMO_WINDOW_SIZE):
+    """Write the demo's parsed frame and default windows, replacing any older artifact."""
+    digest = file_digest(DEMO_PATH)
+    frames = demo_frames(window_size)
+    os.makedirs(demo_dir, exist_ok=True)
+    for name in os.listdir(demo_dir):
+        os.remove(os.path.join(demo_dir, name))
+    for kind, frame in frames.items():
+        # Same layout as the disk cache, so it can be memory-mapped
+        frame.write_ipc(artifact_path(digest, kind, demo_dir), compression="uncompressed", compat_level=pl.CompatLevel.oldest())
+    return digest
+
+
+def stale_demo_artifacts(demo_dir=DEMO_DIR, window_size=DEMO_WINDOW_SIZE):
+    """Artifact kinds that are missing or differ from a fresh computation, empty when the artifact is current."""
+    digest = file_digest(DEMO_PATH)
+    stale = []
+    for kind, frame in demo_frames(window_size).items():
+        saved = _read(artifact_path(digest, kind, demo_dir))
+        if saved is None or saved.schema != frame.schema or not _values(saved).equals(_values(frame)):
+            stale.append(kind)
+    return stale
+
+
+if __name__ == "__main__":
+    if "--check" in sys.argv[1:]:
+        stale = stale_demo_artifacts()
+        print(f"Stale demo artifact: {', '.join(stale)}" if stale else "Demo artifact is current", file=sys.stderr)
+        sys.exit(1 if stale else 0)
+    print(f"Demo artifact {build_demo_artifact()} written to {DEMO_DIR}", file=sys.stderr)
@@ -0,0 +1,60 @@
+import numpy as np
+
+# Default upper bound for points sent to the browser per chart
+CHART_MAX_POINTS = 2000
+
+def build_pyramid(values):
+    """
+    Multi-resolution aggregate pyramid over a series (e.g. UUIW).
+    Level k holds, for every bucket of 2**k consecutive rows, the row of its maximum and of its minimum.
+    Building it is O(n), levels are derived pairwise from the level below.
+    """
+    values = np.asarray(values)
+    rows = np.arange(len(values))
+    levels = [(rows, rows)]
+    while len(levels[-1][0]) > 1:
+        max_rows, min_rows = levels[-1]
+        levels.append((_pairwise(values, max_rows, np.greater), _pairwise(values, min_rows, np.less)))
+    return levels
+
+def _pairwise(values, rows, better):
+    if len(rows) % 2:
+        rows = np.append(rows, rows[-1])
+    left, right = rows[0::2], rows[1::2]
+    # Ties keep the earlier row
+    return np.where(better(values[right], values[left]), right, left)
+
+def downsample_rows(values, pyramid, start, end, max_points=CHART_MAX_POINTS, keep_min=True, keep_rows=None):
+    """
+    Rows to draw for rows [start, end) so that at most about max_points are rendered.
+    Uses the coarsest pyramid level that still fits, keeping every bucket's maximum
+    (and minimum, for line charts), so local peaks are never dropped.
+    keep_rows (e.g. the top table's peaks) are always included.
+    """
+    values = np.asarray(values)
+    start, end = max(start, 0), min(end, len(values))
+    if end - start <= max_points:
+        rows = np.arange(start, end)
+    else:
+        per_bucket = 2 if keep_min else 1
+        level = 0
+        # +2 leaves room for the partial buckets at both edges
+        while -(-(end - start) // 2 ** level) + 2 > max(max_points // per_bucket, 3):
+            level += 1
+        size = 2 ** level
+        max_rows, min_rows = pyramid[level]
+        first_full, last_full = -(-start // size), end // size
+        parts = [max_rows[first_full:last_full]]
+        if keep_min:
+            parts.append(min_rows[first_full:last_full])
+        # Edge buckets only partly inside the range are reduced directly
+        for lo, hi in ((start, min(first_full * size, end)), (max(last_full * size, start), end)):
+            if lo < hi:
+                parts.append([lo + np.argmax(values[lo:hi])])
+                if keep_min:
+                    parts.append([lo + np.argmin(values[lo:hi])])
+        rows = np.unique(np.concatenate(parts).astype(np.int64))
+    if keep_rows is not None and len(keep_rows):
+        keep_rows = np.asarray(keep_rows, dtype=np.int64)
+        rows = np.union1d(rows, keep_rows[(keep_rows >= start) & (keep_rows < end)])
+    return rows
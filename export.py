@@ -0,0 +1,97 @@
+"""
+Columnar export of analysis results, so notebooks load them without re-running anything:
+
+    import polars as pl
+    results = pl.read_parquet("export/1828948529_results.parquet")
+    peaks = results.filter(pl.col("Rank").is_not_null()).sort("Rank")
+    peaks.select(["Rank", "Messages"]).explode("Messages").unnest("Messages")  # one row per message of every peak
+
+One row per second of the windowed series (Time, UUIW, Surprise when ranked by it, MsgStart/MsgEnd).
+Peak rows also carry their Rank, timestamp_url and the window's messages as a list of
+Time/User/Message structs, instead of the ' | '-joined strings of the CSV exports.
+"""
+import io
+
+import numpy as np
+import polars as pl
+
+from chat_index import window_rows
+from processing import vod_timestamp_url_expr
+
+# File extension -> MIME type
+EXPORT_FORMATS = {
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.file",
+}
+EXPORT_COMPRESSION = "zstd"
+
+MESSAGE_STRUCT = pl.Struct({"Time": pl.Int64, "User": pl.String, "Message": pl.String})
+
+
+def _peak_messages(messages: pl.DataFrame, starts, ends) -> pl.Series:
+    """All messages of every window in [starts, ends), one list per window."""
+    rows, peak = window_rows(starts, ends)
+    return (
+        messages[rows]
+        .select([
+            pl.Series("Peak", peak),
+            pl.struct([pl.col("Time").cast(pl.Int64), pl.col("User").cast(pl.String), pl.col("Message").cast(pl.String)]).alias("Messages"),
+        ])
+        .group_by("Peak", maintain_order=True).agg("Messages")
+        # Windows without messages still need their (empty) list
+        .join(pl.DataFrame({"Peak": np.arange(len(starts))}), on="Peak", how="right")
+        .sort("Peak")["Messages"]
+        .fill_null([])
+        .cast(pl.List(MESSAGE_STRUCT))
+    )
+
+
+def results_frame(windows: pl.DataFrame, peak_rows, messages: pl.DataFrame, vod_id=None) -> pl.DataFrame:
+    """
+    The export table. windows: Time/UUIW/MsgStart/MsgEnd (and optionally Surprise) rows as the window
+    engines return them, peak_rows: select_peaks positions best first, messages: the frame the
+    MsgStart/MsgEnd offsets point into.
+    """
+    peak_rows = np.asarray(peak_rows, dtype=np.int64)
+    starts, ends = windows["MsgStart"].to_numpy()[peak_rows], windows["MsgEnd"].to_numpy()[peak_rows]
+    peaks = pl.DataFrame({
+        "Row": peak_rows.astype(np.uint32),
+        "Rank": np.arange(1, len(peak_rows) + 1, dtype=np.int64),
+        "Messages": _peak_messages(messages, starts, ends) if len(peak_rows) else pl.Series([], dtype=pl.List(MESSAGE_STRUCT)),
+    })
+    columns = [pl.col("Time").cast(pl.Int64), pl.col("UUIW").cast(pl.Int64)]
+    if "Surprise" in windows.columns:
+        columns.append(pl.col("Surprise").cast(pl.Float64))
+    columns += [pl.col("MsgStart").cast(pl.Int64), pl.col("MsgEnd").cast(pl.Int64)]
+    return (
+        windows.with_row_index("Row")
+        .join(peaks, on="Row", how="left")
+        .select(columns + [
+            "Rank",
+            pl.when(pl.col("Rank").is_not_null()).then(vod_timestamp_url_expr(pl.col("Time"), vod_id)).alias("timestamp_url"),
+            "Messages",
+        ])
+    )
+
+
+def write_results(df: pl.DataFrame, file, fmt="parquet"):
+    """Write a results_frame to a path or binary buffer as zstd-compressed Parquet or Arrow IPC."""
+    if fmt == "parquet":
+        df.write_parquet(file, compression=EXPORT_COMPRESSION, statistics=True)
+    elif fmt == "arrow":
+        df.write_ipc(file, compression=EXPORT_COMPRESSION)
+    else:
+        raise ValueError(f"unknown export format {fmt!r}, expected one of {', '.join(EXPORT_FORMATS)}")
+
+
+def results_bytes(df: pl.DataFrame, fmt="parquet") -> bytes:
+    """write_results into memory, for a download button."""
+    buffer = io.BytesIO()
+    write_results(df, buffer, fmt)
+    return buffer.getvalue()
+
+
+def read_results(file, fmt=None) -> pl.DataFrame:
+    """Load an export back, the format guessed from the file extension when not given."""
+    fmt = fmt or ("arrow" if str(file).endswith(".arrow") else "parquet")
+    return pl.read_ipc(file, memory_map=False) if fmt == "arrow" else pl.read_parquet(file)
@@ -0,0 +1,115 @@
+"""
+Message filters from config: bot names, command prefixes, blocked phrases and regexes,
+compiled into one Polars expression (one vectorized pass over the frame).
+
+    # filters.toml (or the file CHAT_FILTERS points to)
+    bots = ["nightbot", "streamelements", "moobot"]
+    prefixes = ["!", "@"]
+    phrases = ["buy followers", "bit.ly/"]
+    regexes = ['(?i)free\\s+subs']
+"""
+import hashlib
+import json
+import os
+import re
+from dataclasses import dataclass, replace
+
+import polars as pl
+import toml
+
+# Next to the code like cache_utils.CACHE_DIR, so the app and batch runs filter the same way wherever they start from
+FILTERS_PATH = os.environ.get("CHAT_FILTERS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "filters.toml"))
+
+
+@dataclass(frozen=True)
+class FilterConfig:
+    bots: frozenset = frozenset({"nightbot"})     # lowercase user names, matched case-insensitively
+    prefixes: tuple = ("!", "@")                   # messages starting with any of these
+    phrases: tuple = ()                            # substrings, ASCII case-insensitive
+    regexes: tuple = ()                            # Rust regex syntax (as Polars uses)
+
+    def fingerprint(self):
+        """Short stable hash of the rules, for cache keys of anything computed after filtering."""
+        rules = {"bots": sorted(self.bots), "prefixes": list(self.prefixes), "phrases": list(self.phrases), "regexes": list(self.regexes)}
+        return hashlib.blake2b(json.dumps(rules).encode("utf-8"), digest_size=8).hexdigest()
+
+    def without_replies(self):
+        """Same rules with "@" replies kept (apply_filters(filter_replies=False))."""
+        return replace(self, prefixes=tuple(p for p in self.prefixes if p != "@"))
+
+
+def filter_config(bots=(), prefixes=("!", "@"), phrases=(), regexes=()) -> FilterConfig:
+    """Normalized FilterConfig: lowercase bots, no empty or duplicate entries."""
+    return FilterConfig(
+        bots=frozenset(b.strip().lower() for b in bots if b.strip()),
+        prefixes=tuple(dict.fromkeys(p for p in prefixes if p)),
+        phrases=tuple(dict.fromkeys(p for p in phrases if p)),
+        regexes=tuple(dict.fromkeys(r for r in regexes if r)),
+    )
+
+
+DEFAULT_FILTERS = filter_config(bots=["nightbot"])
+
+
+def load_filter_config(path=FILTERS_PATH) -> FilterConfig:
+    """Filters from a TOML file, the defaults (nightbot, ! and @) when it doesn't exist."""
+    if not path or not os.path.exists(path):
+        return DEFAULT_FILTERS
+    config = toml.load(path)
+    return filter_config(
+        bots=config.get("bots", DEFAULT_FILTERS.bots),
+        prefixes=config.get("prefixes", DEFAULT_FILTERS.prefixes),
+        phrases=config.get("phrases", ()),
+        regexes=config.get("regexes", ()),
+    )
+
+
+def keep_expr(config: FilterConfig, users: pl.Series = None) -> pl.Expr:
+    """
+    True for rows to keep. Every rule is a single pass whose cost doesn't grow with the list size:
+    hashed is_in for bots, one anchored alternation for prefixes, Aho-Corasick (str.contains_any)
+    for phrases and one combined regex.
+    users: the User column, if given, bots are resolved against its distinct names once so
+    case-insensitive matching doesn't lowercase every row.
+    """
+    user, message = pl.col("User"), pl.col("Message")
+    # Messages without text or without an author are dropped, as they always have been
+    drop = [message.is_null(), user.is_null()]
+    if config.bots:
+        if users is not None:
+            names = users.unique().cast(pl.String).drop_nulls()
+            bots = names.filter(names.str.to_lowercase().is_in(list(config.bots)))
+            if len(bots):
+                drop.append(user.is_in(bots.to_list()))
+        else:
+            drop.append(user.cast(pl.String).str.to_lowercase().is_in(list(config.bots)))
+    if config.prefixes:
+        drop.append(message.str.contains("^(?:" + "|".join(re.escape(p) for p in config.prefixes) + ")"))
+    if config.phrases:
+        drop.append(message.str.contains_any(list(config.phrases), ascii_case_insensitive=True))
+    if config.regexes:
+        drop.append(message.str.contains("|".join(f"(?:{r})" for r in config.regexes)))
+    return ~pl.any_horizontal(drop)
+
+
+def filter_messages(df: pl.DataFrame, config: FilterConfig = DEFAULT_FILTERS) -> pl.DataFrame:
+    return df.filter(keep_expr(config, df["User"]))
+
+
+def message_filter(config: FilterConfig = DEFAULT_FILTERS):
+    """
+    keep(user, message) for one message at a time (live mode), same rules as keep_expr.
+    Python's re has no contains_any, phrases go into one compiled alternation instead.
+    """
+    phrases = re.compile("|".join(re.escape(p) for p in config.phrases), re.IGNORECASE | re.ASCII) if config.phrases else None
+    regex = re.compile("|".join(f"(?:{r})" for r in config.regexes)) if config.regexes else None
+
+    def keep(user, message):
+        if user is None or message is None:
+            return False
+        if user.lower() in config.bots or message.startswith(config.prefixes):
+            return False
+        if phrases is not None and phrases.search(message):
+            return False
+        return regex is None or not regex.search(message)
+    return keep
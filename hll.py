@@ -0,0 +1,169 @@
+import hashlib
+from dataclasses import dataclass
+
+import numpy as np
+import polars as pl
+
+from cache_utils import load_cached_array, store_cached_array
+from chat_index import ChatIndex, first_row_at, row_range, windows_frame
+
+# 2**HLL_PRECISION registers per sketch (1 byte each)
+HLL_PRECISION = 10
+# Sketches are estimated, and sliding windows merged, this many at a time so memory stays bounded
+HLL_CHUNK_ROWS = 256
+HLL_CHUNK_SECONDS = 2048
+# 2**-rank for every possible register value
+INVERSE_POWERS = np.ldexp(1.0, -np.arange(256))
+
+
+def hll_standard_error(precision=HLL_PRECISION):
+    """Relative standard error of a HyperLogLog estimate: 1.04 / sqrt(m)."""
+    return 1.04 / np.sqrt(2 ** precision)
+
+
+@dataclass
+class SecondSketches:
+    """One HyperLogLog sketch of chatters per distinct second of a ChatIndex (same order as index.seconds)."""
+    precision: int
+    registers: np.ndarray       # shape (len(index.seconds), 2**precision), uint8
+
+
+def user_hashes(users: pl.Series) -> np.ndarray:
+    """
+    Stable 64-bit hash per row. Hashing is done once per distinct user with blake2b,
+    so sketches stay mergeable across files, processes and library versions.
+    """
+    users = users.cast(pl.String).fill_null("")
+    distinct = users.unique()
+    hashes = [int.from_bytes(hashlib.blake2b(u.encode("utf-8"), digest_size=8).digest(), "little") for u in distinct]
+    return users.replace_strict(distinct, pl.Series(hashes, dtype=pl.UInt64), return_dtype=pl.UInt64).to_numpy()
+
+
+def _bit_length(values):
+    """Vectorized int.bit_length for uint64, split in halves so float conversion stays exact."""
+    hi = (values >> np.uint64(32)).astype(np.float64)
+    lo = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(hi > 0, 32 + np.frexp(hi)[1], np.frexp(lo)[1])
+
+
+def build_second_sketches(index: ChatIndex, precision=HLL_PRECISION) -> SecondSketches:
+    """Add every message's author to the sketch of its second."""
+    m = 2 ** precision
+    hashes = user_hashes(index.messages["User"])
+    register = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    rest = hashes & np.uint64((1 << (64 - precision)) - 1)
+    # Position of the first 1-bit in the remaining 64 - precision bits
+    rank = (64 - precision) - _bit_length(rest) + 1
+
+    second = np.repeat(np.arange(len(index.seconds)), np.diff(index.second_start))
+    cells = (
+        pl.DataFrame({"cell": second * m + register, "rank": rank.astype(np.uint8)})
+        .group_by("cell")
+        .agg(pl.col("rank").max())
+    )
+    registers = np.zeros((len(index.seconds), m), dtype=np.uint8)
+    registers.reshape(-1)[cells["cell"].to_numpy()] = cells["rank"].to_numpy()
+    return SecondSketches(precision, registers)
+
+
+def load_second_sketches(index: ChatIndex, digest=None, precision=HLL_PRECISION, filters_key=None) -> SecondSketches:
+    """
+    build_second_sketches, cached on disk next to the parsed chat when digest is given.
+    Sketches count filtered messages, so filters_key (FilterConfig.fingerprint()) is part of the key.
+    """
+    kind = f"hll-p{precision}" if filters_key is None else f"hll-p{precision}-{filters_key}"
+    if digest is not None:
+        registers = load_cached_array(digest, kind)
+        if registers is not None and registers.shape == (len(index.seconds), 2 ** precision):
+            return SecondSketches(precision, registers)
+    sketches = build_second_sketches(index, precision)
+    if digest is not None:
+        store_cached_array(digest, sketches.registers, kind)
+    return sketches
+
+
+def estimate(registers: np.ndarray) -> np.ndarray:
+    """Cardinality estimate per sketch row, with linear counting for small counts."""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    rows = registers.reshape(-1, m)
+    inverse_sum, zeros = np.empty(len(rows)), np.empty(len(rows), dtype=np.int64)
+    # The float lookup is 8 bytes per register, so only a few rows are expanded at a time
+    for lo in range(0, len(rows), HLL_CHUNK_ROWS):
+        chunk = rows[lo:lo + HLL_CHUNK_ROWS]
+        inverse_sum[lo:lo + len(chunk)] = INVERSE_POWERS[chunk].sum(axis=-1)
+        zeros[lo:lo + len(chunk)] = np.count_nonzero(chunk == 0, axis=-1)
+    raw = alpha * m * m / inverse_sum
+    with np.errstate(divide="ignore"):
+        linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw).reshape(registers.shape[:-1])
+
+
+def merge(registers: np.ndarray) -> np.ndarray:
+    """Union of sketches (rows) into one."""
+    return registers.max(axis=0)
+
+
+def _window_max(dense, length):
+    """Row-wise max of dense[i - length + 1 : i + 1] for every i, in O(log length) passes, overwriting dense."""
+    shifted = np.empty_like(dense)
+
+    def max_with_shifted(offset):
+        shifted[:offset] = 0
+        shifted[offset:] = dense[:len(dense) - offset]
+        np.maximum(dense, shifted, out=dense)
+
+    span = 1
+    while span * 2 <= length:
+        max_with_shifted(span)
+        span *= 2
+    if span < length:
+        # Two overlapping power-of-two blocks cover the window
+        max_with_shifted(length - span)
+    return dense
+
+
+def hll_sliding_windows(index: ChatIndex, sketches: SecondSketches, window_size: int, ignore_threshold: int = 0, time_range=None) -> pl.DataFrame:
+    """
+    Approximate index_sliding_windows: merge the per-second sketches of [t - window_size, t].
+    Seconds are merged HLL_CHUNK_SECONDS at a time, so memory doesn't grow with the VOD's length.
+    """
+    r0, r1, k0, k1 = row_range(index, time_range)
+    if r0 == r1:
+        return windows_frame([], [], [], [], ignore_threshold)
+
+    seconds = index.seconds[k0:k1]
+    registers = sketches.registers[k0:k1]
+    uuiw = np.empty(len(seconds), dtype=np.int64)
+    lo = 0
+    while lo < len(seconds):
+        # Windows ending in [seconds[lo], block_end) need the sketches from block_start on
+        block_end = min(seconds[lo] + HLL_CHUNK_SECONDS, seconds[-1] + 1)
+        block_start = seconds[lo] - window_size
+        hi = np.searchsorted(seconds, block_end, "left")
+        first = np.searchsorted(seconds, block_start, "left")
+        dense = np.zeros((block_end - block_start, registers.shape[1]), dtype=np.uint8)
+        dense[seconds[first:hi] - block_start] = registers[first:hi]
+        merged = _window_max(dense, window_size + 1)[seconds[lo:hi] - block_start]
+        uuiw[lo:hi] = np.rint(estimate(merged))
+        lo = hi
+
+    starts = np.maximum(first_row_at(index, seconds - window_size), r0)
+    ends = index.second_start[k0 + 1:k1 + 1]
+    return windows_frame(seconds, uuiw, starts, ends, ignore_threshold)
+
+
+def hll_tumbling_windows(index: ChatIndex, sketches: SecondSketches, window_size: int, ignore_threshold: int = 0, time_range=None) -> pl.DataFrame:
+    """Approximate index_tumbling_windows: merge the sketches of every second in a window."""
+    r0, r1, k0, k1 = row_range(index, time_range)
+    if r0 == r1:
+        return windows_frame([], [], [], [], ignore_threshold)
+
+    window_id = index.seconds[k0:k1] // window_size
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(window_id)) + 1))
+    merged = np.maximum.reduceat(sketches.registers[k0:k1], starts, axis=0)
+
+    uuiw = np.rint(estimate(merged)).astype(np.int64)
+    row_starts = index.second_start[k0 + starts]
+    row_ends = np.append(row_starts[1:], r1)
+    return windows_frame(window_id[starts] * window_size, uuiw, row_starts, row_ends, ignore_threshold)
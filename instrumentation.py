@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Where stage records go as JSON lines: a file path, "-" for stderr, unset to keep them in memory only
+METRICS_TARGET = os.environ.get("CHAT_METRICS")
+
+
+def rss_bytes():
+    """Current resident set size, None where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class PeakRssSampler:
+    """
+    Samples RSS in a background thread while active. Polars and numpy allocate outside
+    the Python heap, so tracemalloc wouldn't see most of the pipeline's memory.
+    """
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.start_rss = None
+        self.peak_rss = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start_rss = self.peak_rss = rss_bytes()
+        if self.start_rss is not None:
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self._thread is not None:
+            self._done.set()
+            self._thread.join()
+            self._update(rss_bytes())
+        return False
+
+    def _sample(self):
+        while not self._done.wait(self.interval):
+            self._update(rss_bytes())
+
+    def _update(self, rss):
+        if rss is not None and rss > self.peak_rss:
+            self.peak_rss = rss
+
+    @property
+    def peak_growth(self):
+        """Peak RSS above the starting point in bytes, None off Linux."""
+        if self.start_rss is None:
+            return None
+        return self.peak_rss - self.start_rss
+
+
+def _rows(obj):
+    if obj is None:
+        return None
+    if isinstance(obj, int):
+        return obj
+    if hasattr(obj, "height"):
+        return obj.height
+    return len(obj)
+
+
+class PipelineRun:
+    """Stage records of one pipeline run (one Streamlit rerun, one batch VOD...)."""
+    def __init__(self, target=METRICS_TARGET, **context):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.target = target
+        self.context = context
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        """
+        Time a stage: wall time, rows in/out and peak memory growth.
+        Set record["rows_out"] (a frame, a sequence or an int) inside the block.
+        """
+        record = {"stage": name, "rows_in": _rows(rows_in), "rows_out": None}
+        start = time.perf_counter()
+        with PeakRssSampler() as sampler:
+            yield record
+        record["seconds"] = time.perf_counter() - start
+        record["rows_out"] = _rows(record["rows_out"])
+        record["peak_mem_bytes"] = sampler.peak_growth
+        self.records.append(record)
+        self._emit(record)
+
+    def total_seconds(self):
+        return sum(r["seconds"] for r in self.records)
+
+    def _emit(self, record):
+        if not self.target:
+            return
+        line = json.dumps({"run_id": self.run_id, "ts": time.time(), **self.context, **record}, default=str)
+        if self.target == "-":
+            print(line, file=sys.stderr, flush=True)
+        else:
+            with open(self.target, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
@@ -0,0 +1,127 @@
+"""
+Streaming reader for JSON chat dumps, as produced by archive tooling:
+
+    TwitchDownloader   {"streamer": ..., "video": ..., "comments": [{"content_offset_seconds": 12.3,
+                        "commenter": {"display_name": ...}, "message": {"body": ..., "fragments": [...]}}, ...]}
+    chat-downloader    [{"time_in_seconds": 12.3, "author": {"display_name": ...}, "message": ...}, ...]
+
+The document is never loaded whole: it's read in chunks and one comment at a time is decoded
+from a bounded buffer, so memory is the output frame plus a chunk, however large the dump is.
+"""
+import codecs
+import json
+import os
+import re
+
+import polars as pl
+
+JSON_CHUNK_SIZE = 1024 * 1024
+# Comments are turned into a polars frame this many at a time
+JSON_BATCH_ROWS = 100_000
+# Where a TwitchDownloader dump's comment array starts. Keys are the only place an unescaped
+# "comments" followed by a colon can appear, so this can't match inside a title or a message.
+COMMENTS_KEY = re.compile(r'"comments"\s*:\s*\[')
+WHITESPACE = re.compile(r"[\s,]*")
+
+
+def is_json_export(head: bytes) -> bool:
+    """True if a file starting with head is a JSON dump rather than a CSV export."""
+    return head.lstrip(codecs.BOM_UTF8).lstrip()[:1] in (b"{", b"[")
+
+
+def _comment_row(comment):
+    """(time, user, message) of one comment in either layout."""
+    if "content_offset_seconds" in comment:
+        commenter = comment.get("commenter") or {}
+        message = comment.get("message")
+        return (
+            comment["content_offset_seconds"],
+            commenter.get("display_name") or commenter.get("name"),
+            message.get("body") if isinstance(message, dict) else message,
+        )
+    author = comment.get("author") or {}
+    return comment.get("time_in_seconds"), author.get("display_name") or author.get("name"), comment.get("message")
+
+
+def iter_comment_rows(file, chunk_size=JSON_CHUNK_SIZE):
+    """
+    (time, user, message) rows of a JSON dump (path or binary file-like), a list per chunk read.
+    Text is buffered only until the comments it holds are decoded, and every comment is reduced
+    to its three fields right away: holding on to whole comment objects makes the garbage
+    collector rescan them over and over.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    f = open(file, "rb") if isinstance(file, (str, os.PathLike)) else file
+    try:
+        buf, pos, eof = "", 0, False
+
+        def more():
+            nonlocal buf, pos, eof
+            data = f.read(chunk_size)
+            eof = not data
+            buf = buf[pos:] + utf8.decode(data, final=eof)
+            pos = 0
+
+        # Find the comment array: the document itself, or the value of "comments"
+        more()
+        stripped = buf.lstrip("\ufeff \t\r\n")
+        if not stripped:
+            return
+        if stripped[0] == "[":
+            pos = len(buf) - len(stripped) + 1
+        else:
+            while True:
+                match = COMMENTS_KEY.search(buf, pos)
+                if match:
+                    pos = match.end()
+                    break
+                if eof:
+                    raise ValueError("no comment array found in JSON chat dump")
+                # Keep a tail in case the key is split across chunks
+                pos = max(len(buf) - 64, 0)
+                more()
+
+        raw_decode, skip = decoder.raw_decode, WHITESPACE.match
+        while True:
+            rows = []
+            while True:
+                pos = skip(buf, pos).end()
+                if pos < len(buf) and buf[pos] == "]":
+                    yield rows
+                    return
+                try:
+                    comment, pos = raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # The next comment continues in the next chunk
+                    if eof:
+                        raise
+                    break
+                rows.append(_comment_row(comment))
+            yield rows
+            more()
+    finally:
+        if f is not file:
+            f.close()
+
+
+def _batch_frame(rows) -> pl.DataFrame:
+    df = pl.DataFrame(rows, schema={"Time": pl.Float64, "User": pl.String, "Message": pl.String}, orient="row")
+    # Offsets are fractional seconds, the CSV layout has whole ones. Comments without one are skipped
+    return df.drop_nulls("Time").with_columns(pl.col("Time").floor().cast(pl.Int32))
+
+
+def read_chat_json(file, chunk_size=JSON_CHUNK_SIZE, batch_rows=JSON_BATCH_ROWS) -> pl.DataFrame:
+    """Parse a TwitchDownloader or chat-downloader JSON dump into the Time/User/Message frame read_chat_csv returns."""
+    frames, rows = [], []
+    for batch in iter_comment_rows(file, chunk_size):
+        rows += batch
+        if len(rows) >= batch_rows:
+            frames.append(_batch_frame(rows))
+            rows = []
+    frames.append(_batch_frame(rows))
+    # Users are dictionary-encoded once for the whole dump, like read_chat_csv does
+    df = pl.concat(frames, rechunk=True).with_columns(pl.col("User").cast(pl.Categorical))
+    if not df["Time"].is_sorted():
+        df = df.sort("Time", maintain_order=True)
+    return df.with_columns(pl.col("Time").set_sorted())
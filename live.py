@@ -0,0 +1,394 @@
+"""
+Live mode: unique chatters per window while a stream is running.
+
+    python live.py --irc irc.chat.twitch.tv:6667 --channel somechannel
+    python live.py --tail path/to/growing_export.csv
+    python live.py --standin twitch-chat-2587926699.csv --speed 20
+
+Messages come from an IRC-style socket (Twitch chat or the local stand-in server) or a tailed CSV.
+Windows are updated incrementally (O(1) amortized work per message) and memory stays bounded by
+LIVE_HISTORY_S seconds of series, however long the stream runs. Peak alerts use the same SLACK
+rule as processing.select_peaks.
+"""
+import argparse
+import asyncio
+import codecs
+import csv
+import io
+import sys
+import threading
+import time
+from collections import deque
+
+import polars as pl
+
+from filters import load_filter_config, message_filter
+from processing import format_seconds_to_ts
+
+# Seconds of per-second series kept in memory (12 hours)
+LIVE_HISTORY_S = 12 * 3600
+LIVE_MAX_ALERTS = 100
+
+
+class PeakDetector:
+    """
+    Online version of select_peaks' rule: a second is alerted once it's the highest score within
+    slack seconds on both sides, so alerts arrive slack seconds late. select_peaks picks the same
+    moments on the finished series, up to which of several equal scores wins a tie.
+    Unlike the offline greedy pass it won't pick a lower second whose only higher neighbour was
+    itself suppressed, so it alerts fewer (only the clear) peaks.
+    """
+    def __init__(self, slack, min_score=0):
+        self.slack = slack
+        self.min_score = min_score
+        self._recent = deque()      # (time, score) of the last slack seconds, scores decreasing
+        self._candidate = None
+
+    def add(self, t, score):
+        """Score of a closed second, returns a confirmed (time, score) peak or None."""
+        alert = None
+        if self._candidate is not None and t - self._candidate[0] > self.slack:
+            alert, self._candidate = self._candidate, None
+
+        while self._recent and self._recent[0][0] < t - self.slack:
+            self._recent.popleft()
+        if not self._recent or score > self._recent[0][1]:
+            self._candidate = (t, score) if score >= self.min_score else None
+        while self._recent and self._recent[-1][1] <= score:
+            self._recent.pop()
+        self._recent.append((t, score))
+        return alert
+
+    def flush(self):
+        alert, self._candidate = self._candidate, None
+        return alert
+
+
+class LiveWindows:
+    """
+    Sliding and tumbling UUIW updated one message at a time. Safe to read (snapshot) from
+    another thread while a consumer is adding messages.
+    """
+    def __init__(self, window_size=12, slack=120, min_alert_uuiw=0, history_s=LIVE_HISTORY_S, filters=None):
+        self.window_size = window_size
+        # Same rules as data_utils.apply_filters, one message at a time
+        self.keep = message_filter(filters or load_filter_config())
+        self.messages = 0
+        # Sliding window [t - window_size, t]: its messages and how many each user has in it
+        self._window = deque()
+        self._window_users = {}
+        self._second = None
+        # Tumbling window currently filling up
+        self._bucket = None
+        self._bucket_users = set()
+        # Closed seconds / windows and alerts, bounded
+        self.sliding = deque(maxlen=history_s)
+        self.tumbling = deque(maxlen=history_s // window_size + 1)
+        self.alerts = deque(maxlen=LIVE_MAX_ALERTS)
+        self.peaks = PeakDetector(slack, min_alert_uuiw)
+        self._lock = threading.Lock()
+
+    def add(self, t, user, message):
+        """One chat message at second t. Returns a (Time, UUIW) alert or None."""
+        if not self.keep(user, message):
+            return None
+        with self._lock:
+            alert = None
+            if self._second is not None:
+                # Live sources can deliver slightly out of order, never go back in time
+                t = max(t, self._second)
+                if t > self._second:
+                    alert = self._close_second()
+            self._second = t
+            self.messages += 1
+
+            while self._window and self._window[0][0] < t - self.window_size:
+                _, old_user = self._window.popleft()
+                count = self._window_users[old_user] - 1
+                if count:
+                    self._window_users[old_user] = count
+                else:
+                    del self._window_users[old_user]
+            self._window.append((t, user))
+            self._window_users[user] = self._window_users.get(user, 0) + 1
+
+            bucket = t // self.window_size
+            if bucket != self._bucket:
+                self._close_bucket()
+                self._bucket = bucket
+            self._bucket_users.add(user)
+            return alert
+
+    def flush(self):
+        """Close the open second and window (end of stream). Returns a last alert or None."""
+        with self._lock:
+            alert = self._close_second() if self._second is not None else None
+            self._close_bucket()
+            last = self.peaks.flush()
+            if last is not None:
+                self.alerts.append(last)
+            self._second, self._bucket = None, None
+            return alert or last
+
+    def _close_second(self):
+        uuiw = len(self._window_users)
+        self.sliding.append((self._second, uuiw))
+        alert = self.peaks.add(self._second, uuiw)
+        if alert is not None:
+            self.alerts.append(alert)
+        return alert
+
+    def _close_bucket(self):
+        if self._bucket is not None:
+            self.tumbling.append((self._bucket * self.window_size, len(self._bucket_users)))
+        self._bucket_users = set()
+
+    def snapshot(self, window_type="Sliding"):
+        """Closed windows as a Time/UUIW frame, plus the open one so charts don't lag a second."""
+        with self._lock:
+            if window_type == "Sliding":
+                rows = list(self.sliding)
+                if self._second is not None:
+                    rows.append((self._second, len(self._window_users)))
+            else:
+                rows = list(self.tumbling)
+                if self._bucket is not None:
+                    rows.append((self._bucket * self.window_size, len(self._bucket_users)))
+        return pl.DataFrame(rows, schema={"Time": pl.Int64, "UUIW": pl.Int64}, orient="row")
+
+    def alerts_frame(self):
+        with self._lock:
+            rows = list(self.alerts)
+        return pl.DataFrame(rows, schema={"Time": pl.Int64, "UUIW": pl.Int64}, orient="row")
+
+
+def parse_privmsg(line):
+    """(sent ms or None, user, message) of an IRC PRIVMSG line, None for anything else."""
+    sent_ms = None
+    if line.startswith("@"):
+        tags, _, line = line.partition(" ")
+        for tag in tags[1:].split(";"):
+            key, _, value = tag.partition("=")
+            if key == "tmi-sent-ts" and value.isdigit():
+                sent_ms = int(value)
+    if not line.startswith(":"):
+        return None
+    prefix, _, rest = line[1:].partition(" ")
+    command, _, rest = rest.partition(" ")
+    if command != "PRIVMSG":
+        return None
+    _, _, message = rest.partition(" :")
+    return sent_ms, prefix.split("!", 1)[0], message
+
+
+async def irc_messages(host, port, channel, nick="justinfan12345", password=None):
+    """
+    (second, user, message) from an IRC chat. Seconds count from the first message, using
+    Twitch's tmi-sent-ts tag when present and arrival time otherwise.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    if password:
+        writer.write(f"PASS {password}\r\n".encode())
+    writer.write(f"CAP REQ :twitch.tv/tags\r\nNICK {nick}\r\nJOIN #{channel.lstrip('#')}\r\n".encode())
+    await writer.drain()
+    start_ms = None
+    try:
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").rstrip("\r\n")
+            if line.startswith("PING"):
+                writer.write(f"PONG{line[4:]}\r\n".encode())
+                await writer.drain()
+                continue
+            parsed = parse_privmsg(line)
+            if parsed is None:
+                continue
+            sent_ms, user, message = parsed
+            if sent_ms is None:
+                sent_ms = int(time.time() * 1000)
+            if start_ms is None:
+                start_ms = sent_ms
+            yield (sent_ms - start_ms) // 1000, user, message
+    finally:
+        writer.close()
+
+
+def _complete_records(text):
+    """Split text after its last newline outside a quoted field: (complete CSV records, the partial rest)."""
+    end = offset = quotes = 0
+    for line in text.split("\n")[:-1]:
+        offset += len(line) + 1
+        # Escaped quotes ("") come in pairs, so an even count means we're outside any field
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            end = offset
+    return text[:end], text[end:]
+
+
+async def tail_messages(path, poll_interval=0.5, from_start=True):
+    """(second, user, message) from a CSV export that is still being appended to."""
+    pending = ""
+    # Incremental so a character split across two reads survives, and a bad byte doesn't end the tail
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    with open(path, "rb") as f:
+        if not from_start:
+            f.seek(0, 2)
+        while True:
+            chunk = decoder.decode(f.read())
+            if not chunk:
+                await asyncio.sleep(poll_interval)
+                continue
+            pending += chunk
+            records, pending = _complete_records(pending)
+            for row in csv.reader(io.StringIO(records, newline="")):
+                # Header and malformed rows (same spirit as on_bad_lines="skip")
+                if len(row) < 4 or not row[0].isdigit():
+                    continue
+                yield int(row[0]), row[1], row[3]
+
+
+async def serve_standin(chat: pl.DataFrame, host="127.0.0.1", port=0, speed=1.0, channel="standin"):
+    """
+    Local stand-in for Twitch IRC: replays a Time/User/Message chat to every client that joins,
+    speed times faster than real time, tagged with tmi-sent-ts like the real thing.
+    """
+    base_ms = int(time.time() * 1000)
+    rows = chat.select(["Time", "User", "Message"]).with_columns(pl.col("User").cast(pl.String)).sort("Time", maintain_order=True)
+
+    async def handle(reader, writer):
+        try:
+            while not (await reader.readline()).startswith(b"JOIN"):
+                pass
+            start = time.monotonic()
+            for (second,), group in rows.group_by(["Time"], maintain_order=True):
+                delay = second / speed - (time.monotonic() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                writer.write("".join(
+                    f"@tmi-sent-ts={base_ms + second * 1000} :{user}!{user}@{user}.tmi.twitch.tv PRIVMSG #{channel} :{message}\r\n"
+                    for _, user, message in group.iter_rows()
+                ).encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+async def consume(source, live: LiveWindows, on_alert=None):
+    """Feed an async (second, user, message) source into live until it ends or is cancelled."""
+    try:
+        async for t, user, message in source:
+            alert = live.add(t, user, message)
+            if alert is not None and on_alert is not None:
+                on_alert(alert)
+    finally:
+        alert = live.flush()
+        if alert is not None and on_alert is not None:
+            on_alert(alert)
+
+
+class LiveSession:
+    """
+    Runs consume() on its own event loop in a daemon thread, so Streamlit reruns can read live state.
+    make_source is an async function returning the message source (see irc_source, tail_source, standin_source).
+    """
+    def __init__(self, live: LiveWindows, make_source):
+        self.live = live
+        self.error = None
+        self._make_source = make_source
+        self._loop, self._task = None, None
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            asyncio.run(self._main())
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    async def _main(self):
+        self._loop, self._task = asyncio.get_running_loop(), asyncio.current_task()
+        self._started.set()
+        await consume(await self._make_source(), self.live)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def stop(self):
+        if self.running and self._started.wait(timeout=5):
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        self._thread.join(timeout=5)
+
+
+def irc_source(host, port, channel):
+    """make_source for LiveSession."""
+    async def make_source():
+        return irc_messages(host, port, channel)
+    return make_source
+
+
+def tail_source(path):
+    """make_source for LiveSession."""
+    async def make_source():
+        return tail_messages(path)
+    return make_source
+
+
+def standin_source(chat: pl.DataFrame, speed):
+    """make_source for LiveSession: start a stand-in server and read it like a real chat."""
+    async def make_source():
+        server = await serve_standin(chat, speed=speed)
+        host, port = server.sockets[0].getsockname()[:2]
+        return irc_messages(host, port, "standin")
+    return make_source
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--irc", metavar="HOST:PORT", help="IRC chat server, e.g. irc.chat.twitch.tv:6667")
+    source.add_argument("--tail", metavar="CSV", help="CSV export that is still being written")
+    source.add_argument("--standin", metavar="CSV", help="replay a finished CSV export through a local stand-in server")
+    parser.add_argument("--channel", default="standin", help="channel to join with --irc")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed for --standin")
+    parser.add_argument("--window-size", type=int, default=12)
+    parser.add_argument("--slack", type=int, default=120, help="minimum seconds between alerts")
+    parser.add_argument("--min-uuiw", type=int, default=0, help="only alert peaks with at least this many unique users")
+    args = parser.parse_args(argv)
+
+    live = LiveWindows(args.window_size, args.slack, args.min_uuiw)
+
+    def on_alert(alert):
+        t, uuiw = alert
+        print(f"peak at {format_seconds_to_ts(t)}: {uuiw} unique users", flush=True)
+
+    async def run():
+        if args.irc:
+            host, _, port = args.irc.rpartition(":")
+            make_source = irc_source(host, int(port), args.channel)
+        elif args.tail:
+            make_source = tail_source(args.tail)
+        else:
+            from data_utils import read_chat_csv
+            make_source = standin_source(read_chat_csv(args.standin), args.speed)
+        await consume(await make_source(), live, on_alert)
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    print(f"{live.messages} messages, {len(live.alerts)} alerts", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Persistent cross-VOD index (SQLite): every saved VOD's per-second UUIW series and its top peaks,
+keyed by VOD id, so a channel's history can be queried without re-reading any CSV.
+"""
+import os
+import sqlite3
+import time
+
+import numpy as np
+import polars as pl
+
+from processing import select_peaks, ts_expr
+
+# Next to the repo like cache_utils.CACHE_DIR, so the app and batch runs share it wherever they start from
+PEAK_INDEX_PATH = os.environ.get(
+    "CHAT_PEAK_INDEX",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "peak_index.sqlite"),
+)
+# Peaks kept per VOD, more than any TOP N in the app so cross-VOD rankings have depth
+INDEX_TOP_N = 100
+# Series are stored as raw little-endian int32 blobs, one row per VOD
+SERIES_DTYPE = np.dtype("<i4")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vods (
+    vod_id INTEGER PRIMARY KEY,
+    file_name TEXT,
+    window_type TEXT NOT NULL,
+    window_size INTEGER NOT NULL,
+    slack INTEGER NOT NULL,
+    messages INTEGER NOT NULL,
+    duration_s INTEGER NOT NULL,
+    max_uuiw INTEGER NOT NULL,
+    max_uuiw_time INTEGER,
+    indexed_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS series (
+    vod_id INTEGER PRIMARY KEY REFERENCES vods(vod_id) ON DELETE CASCADE,
+    times BLOB NOT NULL,
+    uuiw BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS peaks (
+    vod_id INTEGER NOT NULL REFERENCES vods(vod_id) ON DELETE CASCADE,
+    rank INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    uuiw INTEGER NOT NULL,
+    PRIMARY KEY (vod_id, rank)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS peaks_by_uuiw ON peaks (uuiw DESC);
+CREATE INDEX IF NOT EXISTS vods_by_max_uuiw ON vods (max_uuiw DESC);
+"""
+
+PEAK_SCHEMA = {"VodId": pl.Int64, "Rank": pl.Int64, "Time": pl.Int64, "UUIW": pl.Int64}
+VOD_COLUMNS = ["vod_id", "file_name", "window_type", "window_size", "slack", "messages", "duration_s", "max_uuiw", "max_uuiw_time", "indexed_at"]
+
+
+def connect(path=PEAK_INDEX_PATH, timeout=30) -> sqlite3.Connection:
+    """Open (and create if needed) the index. Batch workers write concurrently, hence the lock timeout."""
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def save_vod(conn, vod_id, windows: pl.DataFrame, window_type, window_size, slack, messages=0, file_name=None, top_n=INDEX_TOP_N):
+    """
+    Store (or replace) one VOD: windows is a full-range Time/UUIW frame from the window engines.
+    Peaks are picked again here with select_peaks so every VOD is indexed to the same depth.
+    """
+    times = windows["Time"].to_numpy()
+    uuiw = windows["UUIW"].to_numpy()
+    peak_rows = select_peaks(times, uuiw, slack, top_n)
+    peaks = [(vod_id, rank, int(times[row]), int(uuiw[row])) for rank, row in enumerate(peak_rows, start=1)]
+
+    with conn:
+        conn.execute("DELETE FROM vods WHERE vod_id = ?", (vod_id,))
+        conn.execute(
+            f"INSERT INTO vods ({', '.join(VOD_COLUMNS)}) VALUES ({', '.join('?' * len(VOD_COLUMNS))})",
+            (
+                vod_id, file_name, window_type, window_size, slack, messages,
+                int(times.max()) if len(times) else 0,
+                peaks[0][3] if peaks else 0,
+                peaks[0][2] if peaks else None,
+                time.time(),
+            ),
+        )
+        conn.execute(
+            "INSERT INTO series (vod_id, times, uuiw) VALUES (?, ?, ?)",
+            (vod_id, times.astype(SERIES_DTYPE).tobytes(), uuiw.astype(SERIES_DTYPE).tobytes()),
+        )
+        conn.executemany("INSERT INTO peaks (vod_id, rank, time, uuiw) VALUES (?, ?, ?, ?)", peaks)
+
+
+def delete_vod(conn, vod_id):
+    with conn:
+        conn.execute("DELETE FROM vods WHERE vod_id = ?", (vod_id,))
+
+
+def list_vods(conn, min_peak=None, limit=None) -> pl.DataFrame:
+    """Indexed VODs, newest (highest VOD id) first, optionally only those whose peak exceeded min_peak."""
+    query = f"SELECT {', '.join(VOD_COLUMNS)} FROM vods"
+    params = []
+    if min_peak is not None:
+        query += " WHERE max_uuiw > ?"
+        params.append(min_peak)
+    query += " ORDER BY vod_id DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    rows = conn.execute(query, params).fetchall()
+    return pl.DataFrame(rows, schema=VOD_COLUMNS, orient="row")
+
+
+def top_moments(conn, n=50, last_vods=None) -> pl.DataFrame:
+    """Best n peaks across the last_vods most recent VODs (all VODs when None)."""
+    vods = "SELECT vod_id FROM vods ORDER BY vod_id DESC"
+    params = []
+    if last_vods is not None:
+        vods += " LIMIT ?"
+        params.append(last_vods)
+    rows = conn.execute(
+        f"""
+        SELECT vod_id, rank, time, uuiw FROM peaks
+        WHERE vod_id IN ({vods})
+        ORDER BY uuiw DESC, vod_id DESC, time
+        LIMIT ?
+        """,
+        params + [n],
+    ).fetchall()
+    return add_vod_links(pl.DataFrame(rows, schema=PEAK_SCHEMA, orient="row"))
+
+
+def load_series(conn, vod_id) -> pl.DataFrame:
+    """Saved Time/UUIW series of one VOD (empty if it isn't indexed)."""
+    row = conn.execute("SELECT times, uuiw FROM series WHERE vod_id = ?", (vod_id,)).fetchone()
+    if row is None:
+        return pl.DataFrame(schema={"Time": pl.Int64, "UUIW": pl.Int64})
+    return pl.DataFrame({
+        "Time": np.frombuffer(row[0], dtype=SERIES_DTYPE).astype(np.int64),
+        "UUIW": np.frombuffer(row[1], dtype=SERIES_DTYPE).astype(np.int64),
+    })
+
+
+def add_vod_links(peaks: pl.DataFrame) -> pl.DataFrame:
+    """Timestamp and timestamp_url for peaks of many VODs (processing.add_timestamps is per VOD)."""
+    return peaks.with_columns([
+        ts_expr(pl.col("Time")).alias("Timestamp"),
+        pl.format("https://www.twitch.tv/videos/{}?t={}", pl.col("VodId"), ts_expr(pl.col("Time") - 30)).alias("timestamp_url"),
+    ])
@@ -1,8 +1,10 @@
-import time
-import html
-import pandas as pd
+import bisect
+import numpy as np
 import polars as pl
 
+# Half-life of the rolling baseline surprise scores compare against, in seconds
+SURPRISE_HALF_LIFE = 600
+
 def format_messages(messages):
     if messages is not None and len(messages) > 1:
         msgs = messages.split(" || ")[:30]
@@ -11,14 +13,37 @@ def format_messages(messages):
         return ''
 
 def format_seconds_to_ts(seconds):
-    return time.strftime("%Hh%Mm%Ss", time.gmtime(seconds))
+    seconds = max(int(seconds), 0)
+    return f"{seconds // 3600:02d}h{seconds % 3600 // 60:02d}m{seconds % 60:02d}s"
 
 def format_vod_timestamp_url(time_in_seconds, vod_id):
-    vod_timestamp = time.strftime("%Hh%Mm%Ss", time.gmtime(time_in_seconds - 30))
     if vod_id:
-        return f"https://www.twitch.tv/videos/{vod_id}?t={vod_timestamp}"
+        return f"https://www.twitch.tv/videos/{vod_id}?t={format_seconds_to_ts(time_in_seconds - 30)}"
     return None
 
+def ts_expr(seconds: pl.Expr) -> pl.Expr:
+    """Vectorized format_seconds_to_ts, e.g. 01h02m03s."""
+    seconds = seconds.clip(lower_bound=0)
+    return pl.format(
+        "{}h{}m{}s",
+        (seconds // 3600).cast(pl.String).str.zfill(2),
+        (seconds % 3600 // 60).cast(pl.String).str.zfill(2),
+        (seconds % 60).cast(pl.String).str.zfill(2),
+    )
+
+def vod_timestamp_url_expr(seconds: pl.Expr, vod_id) -> pl.Expr:
+    """Vectorized format_vod_timestamp_url, links 30 seconds before the moment."""
+    if vod_id:
+        return pl.lit(f"https://www.twitch.tv/videos/{vod_id}?t=") + ts_expr(seconds - 30)
+    return pl.lit(None, dtype=pl.String)
+
+def add_timestamps(df: pl.DataFrame, vod_id) -> pl.DataFrame:
+    """Adds Timestamp and timestamp_url columns."""
+    return df.with_columns([
+        ts_expr(pl.col("Time")).alias("Timestamp"),
+        vod_timestamp_url_expr(pl.col("Time"), vod_id).alias("timestamp_url"),
+    ])
+
 # Method using pandas, leaving this here just in case I want to create performance comparisons at some point
 def compute_sliding_windows(df, sliding_window):
     uuiw_counts, uuiw_messages = [], []
@@ -48,121 +73,216 @@ def compute_sliding_windows(df, sliding_window):
 
     return df
 
-def add_sliding_windows(df: pl.DataFrame, window_size: int, ignore_threshold: int = 0) -> pl.DataFrame:
+def prepare_messages(df: pl.DataFrame) -> pl.DataFrame:
     """
-    Use LazyFrame.rolling() for sliding windows matching pandas [t - window_size, t] behavior.
-    Adds columns UUIW, UUIW_msgs, MessagePeek.
+    Sort messages by Time and add the columns the window engines work on:
+    UserId (compact integer id per user) and PrevUserRow (row of the same user's
+    previous message, -1 for their first one).
+    Window engines return MsgStart/MsgEnd row offsets into this frame.
     """
-
-    # Ensure df has needed cols
-    assert {"Time", "User", "Message"}.issubset(set(df.columns)), "Need Time, User, Message"
-
-    lf = df.lazy()
-    
-    rolled = (
-        lf.rolling(index_column="Time", period=f"{window_size}i", closed="both")
-        .agg([
-            pl.col("User").n_unique().alias("UUIW"),
-            pl.col("Message").str.concat(" || ").alias("UUIW_msgs")
-        ])
-    )
-    
-    # Collapse per-time duplicates (aggregate messages + keep UUIW)
-    rolled = (
-        rolled.group_by("Time")
-        .agg([
-            pl.col("UUIW").max(),  # just take max, they’re the same within each Time
-            pl.col("UUIW_msgs").max()
+    df = df.select(["Time", "User", "Message"])
+    if not df["Time"].is_sorted():
+        df = df.sort("Time", maintain_order=True)
+    return (
+        df.with_row_index("Row")
+        .with_columns([
+            _user_ids(df).alias("UserId"),
+            pl.col("Row").cast(pl.Int64).shift(1).over("User").fill_null(-1).alias("PrevUserRow"),
         ])
+        .drop("Row")
     )
 
-    
-    out_lf = (
-        lf.join(rolled, on="Time", how="left")
-        .with_columns([
-            pl.col("UUIW").fill_null(0).cast(pl.Int64),
-            pl.col("UUIW_msgs").fill_null(""),
-            pl.when(pl.col("UUIW_msgs") == "")
-              .then(pl.lit(""))
-              .otherwise(
-                  pl.col("UUIW_msgs")
-                    .str.split(" || ")
-                    .list.slice(0, 30)
-                    .list.eval(pl.element().str.slice(0, 30))
-                    .list.join("<br>")
-              )
-              .alias("MessagePeek"),
-        ])
+def _user_ids(df: pl.DataFrame) -> pl.Expr:
+    # Dictionary-encoded users (see data_utils.read_chat_csv) already carry integer ids
+    user = pl.col("User")
+    if df.schema["User"] != pl.Categorical:
+        user = user.cast(pl.String).cast(pl.Categorical)
+    codes = user.to_physical().cast(pl.Int64)
+    # Messages without a user share an id of their own, as they share a PrevUserRow chain
+    return codes.fill_null(codes.max() + 1).fill_null(0)
+
+def sliding_window_uuiw(df: pl.DataFrame, window_size: int) -> pl.DataFrame:
+    """
+    Two-pointer pass over the sorted Time column, matching pandas [t - window_size, t] behavior.
+    Keeps a per-user message count for the current window, so every row enters and leaves it once.
+    Returns one row per distinct second with columns Time, UUIW, MsgStart, MsgEnd,
+    where MsgStart/MsgEnd are the window's row offsets into df (end exclusive).
+    """
+    if "UserId" not in df.columns:
+        df = prepare_messages(df)
+
+    times = df["Time"].to_list()
+    users = df["UserId"].to_list()
+    counts = [0] * (max(users) + 1 if users else 0)
+
+    out_times, out_uuiw, out_start, out_end = [], [], [], []
+    unique = 0
+    lo = hi = 0
+    n = len(times)
+    while hi < n:
+        t = times[hi]
+        # Add every message sent during this second
+        while hi < n and times[hi] == t:
+            u = users[hi]
+            if counts[u] == 0:
+                unique += 1
+            counts[u] += 1
+            hi += 1
+        # Drop messages that fell out of the window
+        while times[lo] < t - window_size:
+            u = users[lo]
+            counts[u] -= 1
+            if counts[u] == 0:
+                unique -= 1
+            lo += 1
+        out_times.append(t)
+        out_uuiw.append(unique)
+        out_start.append(lo)
+        out_end.append(hi)
+
+    return pl.DataFrame(
+        {"Time": out_times, "UUIW": out_uuiw, "MsgStart": out_start, "MsgEnd": out_end},
+        schema={"Time": df.schema["Time"], "UUIW": pl.Int64, "MsgStart": pl.Int64, "MsgEnd": pl.Int64},
     )
-    out_lf = (out_lf.filter(pl.col('UUIW') >= ignore_threshold))
-    out_lf = out_lf.select(['Time', 'UUIW', 'UUIW_msgs', 'MessagePeek'])
-    return out_lf.collect()
+
+def add_sliding_windows(df: pl.DataFrame, window_size: int, ignore_threshold: int = 0) -> pl.DataFrame:
+    """
+    Sliding windows matching pandas [t - window_size, t] behavior, one row per distinct second.
+    df must come from prepare_messages.
+    Returns columns Time, UUIW, MsgStart, MsgEnd.
+    """
+
+    # Ensure df has needed cols
+    assert {"Time", "UserId", "PrevUserRow"}.issubset(set(df.columns)), "Use prepare_messages() first"
+
+    out = sliding_window_uuiw(df, window_size)
+    return out.filter(pl.col('UUIW') >= ignore_threshold)
 
 def add_tumbling_window(df: pl.DataFrame, window_size: int, ignore_threshold: int = 0) -> pl.DataFrame:
     """
-    Compute UUIW (unique users) and UUIW_msgs (concat first message per user)
-    using fixed-length tumbling windows like 0–11s, 12–23s, etc.
-    Adds a 'window_start_ts' column formatted as 00h00m00s style.
+    Compute UUIW (unique users) using fixed-length tumbling windows like 0–11s, 12–23s, etc.
+    df must come from prepare_messages, so every window is a contiguous run of rows.
+    Returns columns Time (window start), UUIW, MsgStart, MsgEnd.
     """
-    lf = df.lazy()
+    assert {"Time", "UserId", "PrevUserRow"}.issubset(set(df.columns)), "Use prepare_messages() first"
+
+    lf = df.lazy().with_row_index("Row")
     # Assign each row to a window_id
     lf = lf.with_columns(
         (pl.col("Time") // window_size).alias("window_id")
     )
 
     # Aggregate per window
-    uuiw = (
+    result = (
         lf.group_by("window_id")
-        .agg(pl.col("User").n_unique().alias("UUIW"))
-    )
-
-    # One first message per user, then concat
-    msgs = (
-        lf.group_by(["window_id", "User"])
-          .agg(pl.col("Message").first().alias("Msg"))
-          .group_by("window_id")
-          .agg(pl.col("Msg").str.concat(" || ").alias("UUIW_msgs"))
+        .agg([
+            pl.col("UserId").n_unique().cast(pl.Int64).alias("UUIW"),
+            pl.col("Row").min().cast(pl.Int64).alias("MsgStart"),
+            (pl.col("Row").max() + 1).cast(pl.Int64).alias("MsgEnd"),
+        ])
+        .with_columns((pl.col("window_id") * window_size).alias("Time"))
     )
 
-    combined = uuiw.join(msgs, on="window_id")
-
-    # Add numeric start and end seconds
-    result = combined.with_columns([
-        (pl.col("window_id") * window_size).alias("window_start"),
-        ((pl.col("window_id") + 1) * window_size - 1).alias("window_end"),
-    ])
-
-    
-    result = result.with_columns([
-            pl.col("UUIW").fill_null(0).cast(pl.Int64),
-            pl.col("UUIW_msgs").fill_null(""),
-            pl.when(pl.col("UUIW_msgs") == "")
-              .then(pl.lit(""))
-              .otherwise(
-                  pl.col("UUIW_msgs")
-                    .str.split(" || ")
-                    .list.slice(0, 30)
-                    .list.eval(pl.element().str.slice(0, 30))
-                    .list.join("<br>")
-              )
-              .alias("MessagePeek"),
-        ])
     result = (result.filter(pl.col('UUIW') >= ignore_threshold))
-    result = result.rename({'window_start': 'Time'}).select(['Time', 'UUIW', 'UUIW_msgs', 'MessagePeek'])
+    result = result.select(['Time', 'UUIW', 'MsgStart', 'MsgEnd'])
     
     return result.collect().sort("Time")
 
+def window_messages(messages: pl.DataFrame, starts, ends, limit=None):
+    """
+    First message of each user for every window, in chat order.
+    starts/ends are MsgStart/MsgEnd offsets into messages (a prepare_messages frame),
+    so strings are only built for the windows asked for.
+    """
+    prev_rows = messages["PrevUserRow"].to_numpy()
+    texts = messages["Message"]
+    out = []
+    for start, end in zip(starts, ends):
+        rows = np.flatnonzero(prev_rows[start:end] < start)[:limit] + start
+        out.append(texts.gather(rows).fill_null("").to_list())
+    return out
+
+def format_message_peek(msgs, max_msgs=30, max_chars=30):
+    return "<br>".join(m[:max_chars] for m in msgs[:max_msgs])
+
+def message_peeks(messages: pl.DataFrame, starts, ends, max_msgs=30, max_chars=30):
+    """Hover previews (MessagePeek) for the given windows."""
+    return [
+        format_message_peek(msgs, max_msgs, max_chars)
+        for msgs in window_messages(messages, starts, ends, limit=max_msgs)
+    ]
+
+def uuiw_messages(messages: pl.DataFrame, starts, ends):
+    """Full UUIW_msgs strings for the given windows."""
+    return [" || ".join(msgs) for msgs in window_messages(messages, starts, ends)]
+
+
+def _descending_order(scores):
+    """Same order as pandas sort_values(ascending=False), so ties resolve exactly like they always have."""
+    scores = np.asarray(scores)
+    return (len(scores) - 1 - np.argsort(scores[::-1], kind="quicksort"))[::-1]
+
+def select_peaks(times, scores, slack, n):
+    """
+    Greedy non-maximum suppression: take the highest score first and skip anything
+    within slack seconds of an already chosen peak, until n peaks are chosen.
+    Candidates are checked in chunks against the sorted chosen times with searchsorted,
+    only the few survivors of a chunk need a sequential O(log k) check.
+    Returns row positions of the chosen peaks, best first.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    order = _descending_order(scores)
+    chosen, chosen_times = [], []
+    offset, chunk = 0, max(2 * n, 64)
+    while offset < len(order):
+        candidates = order[offset:offset + chunk]
+        offset += chunk
+        if chosen_times:
+            sorted_times = np.asarray(chosen_times)
+            cand_times = times[candidates]
+            # Nearest chosen time at or after t - slack must be past t + slack
+            k = np.searchsorted(sorted_times, cand_times - slack, "left")
+            nearest = sorted_times[np.minimum(k, len(sorted_times) - 1)]
+            free = (k == len(sorted_times)) | (nearest > cand_times + slack)
+            candidates = candidates[free]
+        for i in candidates:
+            t = times[i]
+            k = bisect.bisect_left(chosen_times, t - slack)
+            if k < len(chosen_times) and chosen_times[k] <= t + slack:
+                continue
+            bisect.insort(chosen_times, t)
+            chosen.append(i)
+            if len(chosen) >= n:
+                return np.asarray(chosen, dtype=np.int64)
+        # Most remaining candidates sit next to a chosen peak, so grow the chunk
+        chunk *= 2
+    return np.asarray(chosen, dtype=np.int64)
 
 def get_top_peaks(df, slack, n):
-    candidates = df.sort_values("UUIW", ascending=False).reset_index(drop=True)
-    chosen = []
-
-    for _, row in candidates.iterrows():
-        t = int(row["Time"])
-        if any(abs(t - int(prev["Time"])) <= slack for prev in chosen):
-            continue
-        chosen.append(row)
-        if len(chosen) >= n:
-            break
-
-    return pd.DataFrame(chosen)
+    """Top n rows by UUIW, at least slack seconds apart from each other, best first."""
+    rows = select_peaks(df["Time"].to_numpy(), df["UUIW"].to_numpy(), slack, n)
+    return df[rows]
+
+def add_surprise(df: pl.DataFrame, half_life=SURPRISE_HALF_LIFE) -> pl.DataFrame:
+    """
+    Adds Surprise: how far each window's UUIW is above what chat had been doing, as a z-score
+    against an exponentially weighted mean and variance over the preceding windows (decaying
+    with the time between them, half_life seconds). One vectorized pass over the windows,
+    so a busy late stream doesn't hide a spike from a quiet stretch.
+    """
+    uuiw = pl.col("UUIW").cast(pl.Float64)
+    mean = uuiw.ewm_mean_by("Time", half_life=f"{half_life}i")
+    mean_sq = (uuiw * uuiw).ewm_mean_by("Time", half_life=f"{half_life}i")
+    # Baseline from earlier windows only, so a spike doesn't raise its own bar
+    baseline, variance = mean.shift(1), (mean_sq - mean * mean).shift(1)
+    # Counts are at least Poisson-noisy, a flat baseline shouldn't make +1 user a huge surprise
+    spread = pl.max_horizontal(variance, baseline, pl.lit(1.0)).sqrt()
+    # The first half_life seconds have too little history to be surprising against
+    warm = pl.col("Time") >= pl.col("Time").first() + half_life
+    return df.with_columns(pl.when(warm).then((uuiw - baseline) / spread).otherwise(0.0).fill_null(0.0).alias("Surprise"))
+
+def get_top_surprises(df, slack, n, half_life=SURPRISE_HALF_LIFE):
+    """Top n rows by Surprise, at least slack seconds apart from each other, best first."""
+    df = add_surprise(df, half_life)
+    rows = select_peaks(df["Time"].to_numpy(), df["Surprise"].to_numpy(), slack, n)
+    return df[rows]
@@ -0,0 +1,80 @@
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+import polars as pl
+
+# Per-session budget for memoized pipeline stages
+STAGE_CACHE_MAX_BYTES = int(os.environ.get("CHAT_STAGE_CACHE_MAX_BYTES", 256 * 1024 ** 2))
+
+
+def estimate_size(value, _seen=None):
+    """Rough in-memory size of a stage result in bytes (shared and cyclic references counted once)."""
+    _seen = set() if _seen is None else _seen
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+    if isinstance(value, pl.DataFrame):
+        return value.estimated_size()
+    if isinstance(value, np.ndarray):
+        # Memory-mapped arrays live in the page cache, not in the session
+        return 0 if isinstance(value, np.memmap) else value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v, _seen) for v in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v, _seen) for v in value.values())
+    if hasattr(value, "__dict__"):
+        # Dataclasses (ChatIndex, SecondSketches...), plotly figures, HeavyHitters
+        return sys.getsizeof(value) + estimate_size(vars(value), _seen)
+    return sys.getsizeof(value)
+
+
+class StageCache:
+    """
+    LRU memo of pipeline stage results for one session, bounded by max_bytes.
+    Keys are (stage, key) where key fingerprints the stage's inputs and parameters:
+    pass the upstream stage's key along, so changing one control only misses downstream stages.
+    """
+    def __init__(self, max_bytes=STAGE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()   # (stage, key) -> (value, size)
+
+    def cached(self, stage, key, compute, record=None):
+        """
+        compute() on a miss, the memoized value on a hit.
+        record: a PipelineRun.stage record, gets record["cached"] so the debug panel shows hits.
+        """
+        entry = self._entries.get((stage, key))
+        if record is not None:
+            record["cached"] = entry is not None
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end((stage, key))
+            return entry[0]
+        self.misses += 1
+        value = compute()
+        self.put(stage, key, value)
+        return value
+
+    def put(self, stage, key, value):
+        self.discard(stage, key)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        self._entries[(stage, key)] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def discard(self, stage, key):
+        entry = self._entries.pop((stage, key), None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,146 @@
+import numpy as np
+import polars as pl
+
+# Synthetic Twitch chats for benchmarks: bursty arrivals, Zipf-distributed users, emote-heavy messages.
+
+EMOTES = [
+    "KEKW", "LUL", "OMEGALUL", "PogChamp", "Pog", "PogU", "monkaS", "monkaW", "Kappa", "5Head",
+    "PepeLaugh", "Sadge", "pelSleep", "catJAM", "EZ", "Clap", "LULW", "widepeepoHappy", "D:", "F",
+]
+WORDS = [
+    "clip", "it", "no", "way", "what", "was", "that", "lol", "gg", "wp", "nice", "bro", "chat",
+    "he", "did", "it", "again", "streamer", "pls", "hi", "first", "time", "here", "true", "real",
+]
+COMMAND_PREFIXES = ["!", "@"]
+
+
+def _message_pool(rng, size):
+    """Distinct messages to draw from; popular ones get repeated like chat spam."""
+    pool = []
+    for _ in range(size):
+        kind = rng.random()
+        if kind < 0.45:
+            # Emote spam, e.g. "KEKW KEKW KEKW"
+            pool.append(" ".join([EMOTES[rng.integers(len(EMOTES))]] * int(rng.integers(1, 8))))
+        elif kind < 0.9:
+            tokens = [
+                EMOTES[rng.integers(len(EMOTES))] if rng.random() < 0.35 else WORDS[rng.integers(len(WORDS))]
+                for _ in range(int(rng.integers(1, 10)))
+            ]
+            pool.append(" ".join(tokens))
+        else:
+            pool.append(COMMAND_PREFIXES[rng.integers(len(COMMAND_PREFIXES))] + WORDS[rng.integers(len(WORDS))])
+    return pool
+
+
+def _arrival_weights(rng, duration):
+    """Per-second arrival weights: slowly drifting baseline plus decaying bursts (hype moments)."""
+    baseline = np.exp(np.cumsum(rng.normal(0, 0.02, duration)))
+    baseline /= baseline.mean()
+    bursts = np.zeros(duration)
+    n_bursts = max(1, duration // 600)
+    starts = rng.integers(0, duration, n_bursts)
+    heights = rng.pareto(1.5, n_bursts) * 3 + 2
+    decay = np.exp(-np.arange(60) / 10)
+    for start, height in zip(starts, heights):
+        span = decay[: duration - start]
+        bursts[start:start + len(span)] += height * span
+    weights = baseline * (1 + bursts)
+    return weights / weights.sum()
+
+
+def generate_chat(n_rows, seed=0, duration=None, n_users=None, zipf_a=1.3):
+    """
+    Time/User/Message frame sorted by Time, like data_utils.load_csv returns.
+    duration defaults to a stream length where busy chats get realistic message rates (max 12h).
+    """
+    rng = np.random.default_rng(seed)
+    duration = duration or int(min(12 * 3600, max(600, n_rows // 3)))
+    n_users = n_users or max(50, n_rows // 20)
+
+    counts = rng.multinomial(n_rows, _arrival_weights(rng, duration))
+    times = np.repeat(np.arange(duration, dtype=np.int32), counts)
+
+    user_ids = (rng.zipf(zipf_a, n_rows) - 1) % n_users
+    pool = _message_pool(rng, 2000)
+    message_ids = (rng.zipf(1.2, n_rows) - 1) % len(pool)
+
+    df = pl.DataFrame({
+        "Time": times,
+        "UserId": user_ids,
+        "Message": pl.Series(pool, dtype=pl.String).gather(message_ids),
+    })
+    df = df.with_columns(
+        # One of the most active "users" is a bot, so the filters have something to do
+        pl.when(pl.col("UserId") == 3).then(pl.lit("nightbot"))
+          .otherwise(pl.format("user{}", pl.col("UserId"))).cast(pl.Categorical).alias("User")
+    )
+    return df.select(["Time", "User", "Message"]).with_columns(pl.col("Time").set_sorted())
+
+
+def write_chat_csv(df: pl.DataFrame, path):
+    """Write in the twitchchatdownloader.com export layout (time,user_name,user_color,message)."""
+    df.select([
+        pl.col("Time").alias("time"),
+        pl.col("User").cast(pl.String).alias("user_name"),
+        pl.lit("#9146FF").alias("user_color"),
+        pl.col("Message").alias("message"),
+    ]).write_csv(path)
+
+
+def _twitchdownloader_comments() -> pl.Expr:
+    """One TwitchDownloader comment object per row, with the nesting and extra fields real dumps have."""
+    user = pl.col("User").cast(pl.String)
+    return pl.struct([
+        pl.format("c{}", pl.col("Row")).alias("_id"),
+        pl.lit("video").alias("content_type"),
+        pl.lit("123456789").alias("content_id"),
+        (pl.col("Time") + pl.col("Row") % 1000 / 1000).alias("content_offset_seconds"),
+        pl.struct([
+            user.alias("display_name"),
+            pl.col("Row").cast(pl.String).alias("_id"),
+            user.str.to_lowercase().alias("name"),
+            pl.format("https://static-cdn.jtvnw.net/user-default-pictures/{}.png", pl.col("Row") % 7).alias("logo"),
+        ]).alias("commenter"),
+        pl.struct([
+            pl.col("Message").alias("body"),
+            pl.lit(0).alias("bits_spent"),
+            pl.concat_list([pl.struct([pl.col("Message").alias("text"), pl.lit(None, dtype=pl.String).alias("emoticon")])]).alias("fragments"),
+            pl.concat_list([pl.struct([pl.lit("subscriber").alias("_id"), (pl.col("Row") % 24).cast(pl.String).alias("version")])]).alias("user_badges"),
+            pl.lit("#9146FF").alias("user_color"),
+        ]).alias("message"),
+    ]).struct.json_encode()
+
+
+def _chat_downloader_comments() -> pl.Expr:
+    """One chat-downloader message object per row."""
+    user = pl.col("User").cast(pl.String)
+    return pl.struct([
+        pl.format("m{}", pl.col("Row")).alias("message_id"),
+        pl.col("Message").alias("message"),
+        (pl.col("Time") + pl.col("Row") % 1000 / 1000).alias("time_in_seconds"),
+        pl.format("{}:{}", pl.col("Time") // 60, (pl.col("Time") % 60).cast(pl.String).str.zfill(2)).alias("time_text"),
+        pl.struct([
+            pl.col("Row").cast(pl.String).alias("id"),
+            user.str.to_lowercase().alias("name"),
+            user.alias("display_name"),
+        ]).alias("author"),
+        pl.lit("text_message").alias("message_type"),
+    ]).struct.json_encode()
+
+
+def write_chat_json(df: pl.DataFrame, path, layout="twitchdownloader", batch_rows=100_000):
+    """Write a JSON dump in TwitchDownloader or chat-downloader layout, batch by batch."""
+    encode = _twitchdownloader_comments if layout == "twitchdownloader" else _chat_downloader_comments
+    df = df.with_row_index("Row")
+    with open(path, "w", encoding="utf-8") as f:
+        if layout == "twitchdownloader":
+            f.write('{"FileInfo": {"Version": {"Major": 1}}, "streamer": {"name": "synthetic", "id": 1}, '
+                    '"video": {"title": "Synthetic stream", "id": "123456789", "start": 0}, "comments": [\n')
+        else:
+            f.write("[\n")
+        for offset in range(0, df.height, batch_rows):
+            if offset:
+                f.write(",\n")
+            f.write(",\n".join(df.slice(offset, batch_rows).select(encode()).to_series().to_list()))
+        f.write('\n], "embeddedData": null}\n' if layout == "twitchdownloader" else "\n]\n")
@@ -1,22 +1,34 @@
 import streamlit as st
 import html
+import polars as pl
 
-from processing import format_seconds_to_ts
+from processing import ts_expr, uuiw_messages
+from term_counts import format_top_terms, window_top_terms
 
-def render_top_table(df):
-    df = df[["Time", "timestamp_url", "UUIW", "UUIW_msgs"]].copy()
-    df["Time"] = df["Time"].apply(format_seconds_to_ts)
-    df["timestamp_url"] = df["timestamp_url"].apply(lambda x: f"<a href='{x}' target='_blank'>🔗</a>")
-    df["UUIW_msgs"] = df["UUIW_msgs"].apply(lambda x: html.escape(str(x)))
+def top_table_html(df: pl.DataFrame, messages):
+    starts, ends = df["MsgStart"].to_numpy(), df["MsgEnd"].to_numpy()
+    df = df.select([
+        ts_expr(pl.col("Time")).alias("⏱️"),
+        pl.format("<a href='{}' target='_blank'>🔗</a>", pl.col("timestamp_url").fill_null("None")).alias("🔗"),
+        pl.col("UUIW").alias("Unique Users"),
+    ] + ([pl.col("Surprise").round(1).cast(pl.String).alias("📈 Surprise")] if "Surprise" in df.columns else [])).with_columns([
+        # What chat was spamming during each peak
+        pl.Series("🔥", format_top_terms(window_top_terms(messages, starts, ends), len(starts)), dtype=pl.String),
+        pl.Series("💌", uuiw_messages(messages, starts, ends), dtype=pl.String),
+    ])
 
-    df = df.rename(
-        columns={
-            "Time": "⏱️",
-            "Timestamp": "⏱️ (s)",
-            "timestamp_url": "🔗",
-            "UUIW": "Unique Users",
-            "UUIW_msgs": "💌"
-        }
+    # Same markup pandas' to_html(escape=False, index=False) used to produce
+    header = "".join(f"<th>{col}</th>" for col in df.columns)
+    rows = "".join(
+        f"<tr>{''.join(f'<td>{cell}</td>' for cell in row[:-2])}<td>{html.escape(row[-2])}</td><td>{html.escape(row[-1])}</td></tr>"
+        for row in df.iter_rows()
+    )
+    return (
+        '<table border="1" class="dataframe">'
+        f'<thead><tr style="text-align: right;">{header}</tr></thead>'
+        f"<tbody>{rows}</tbody></table>"
     )
 
-    st.markdown(df.to_html(escape=False, index=False), unsafe_allow_html=True)
+def render_top_table(df: pl.DataFrame, messages, table=None):
+    """table: HTML from top_table_html, when it was built (or memoized) beforehand."""
+    st.markdown(table if table is not None else top_table_html(df, messages), unsafe_allow_html=True)
@@ -0,0 +1,108 @@
+import polars as pl
+
+from chat_index import window_rows
+
+# Same clean-up chat_parser.get_wordcounts does before counting
+TOKEN_STRIP = r'[,?!"]'
+# Whitespace other than a plain space (tabs, newlines, NBSP...), tokens are split on any whitespace like str.split()
+OTHER_WHITESPACE = r'[\s--[ ]]'
+TERM_BATCH_SIZE = 50_000
+TERM_CAPACITY = 2000
+
+
+def tokens_expr(col="Message") -> pl.Expr:
+    """
+    Normalized tokens of each message (a list per message, may contain empty strings where
+    whitespace repeats). Splitting on single spaces after mapping other whitespace to a space
+    is cheaper than a \\s+ split and gives the same tokens once empty strings are dropped.
+    """
+    return (
+        pl.col(col).fill_null("")
+        .str.to_lowercase()
+        .str.replace_all(TOKEN_STRIP, "")
+        .str.replace_all(OTHER_WHITESPACE, " ")
+        .str.split(" ")
+    )
+
+
+def count_terms(df: pl.DataFrame, by=None) -> pl.DataFrame:
+    """Exact Term/Count (occurrences, spam included) for a frame, optionally per `by` group."""
+    keys = [by] if by else []
+    return (
+        df.select(keys + [tokens_expr().alias("Term")])
+        .explode("Term")
+        .filter(pl.col("Term") != "")
+        .group_by(keys + ["Term"])
+        .agg(pl.len().cast(pl.Int64).alias("Count"))
+    )
+
+
+class HeavyHitters:
+    """
+    Bounded-memory term counter (mergeable Misra-Gries summary).
+    Holds at most `capacity` terms. Every batch is counted exactly with polars, merged in,
+    and the summary is cut back to its capacity by subtracting the first dropped count.
+    A reported count undercounts the true one by at most `error`, and any term whose
+    true count exceeds `error` is guaranteed to still be tracked.
+    """
+    def __init__(self, capacity=TERM_CAPACITY):
+        self.capacity = capacity
+        self.counts = pl.DataFrame(schema={"Term": pl.String, "Count": pl.Int64})
+        self.error = 0
+        self.total = 0
+
+    def update(self, batch_counts: pl.DataFrame):
+        """Merge a Term/Count frame (e.g. count_terms of one batch)."""
+        self.total += int(batch_counts["Count"].sum())
+        merged = (
+            pl.concat([self.counts, batch_counts.select(["Term", "Count"])])
+            .group_by("Term")
+            .agg(pl.col("Count").sum())
+            .sort(["Count", "Term"], descending=[True, False])
+        )
+        if merged.height > self.capacity:
+            cut = int(merged["Count"][self.capacity])
+            self.error += cut
+            merged = (
+                merged.head(self.capacity)
+                .with_columns(pl.col("Count") - cut)
+                .filter(pl.col("Count") > 0)
+            )
+        self.counts = merged
+
+    def top(self, k=50) -> pl.DataFrame:
+        return self.counts.head(k)
+
+
+def term_frequencies(messages: pl.DataFrame, batch_size=TERM_BATCH_SIZE, capacity=TERM_CAPACITY) -> HeavyHitters:
+    """Whole-VOD term frequencies, tokenizing the Message column one batch at a time."""
+    hitters = HeavyHitters(capacity)
+    for offset in range(0, messages.height, batch_size):
+        hitters.update(count_terms(messages.slice(offset, batch_size)))
+    return hitters
+
+
+def window_top_terms(messages: pl.DataFrame, starts, ends, k=5) -> pl.DataFrame:
+    """
+    Exact top k terms for each window [MsgStart, MsgEnd), meant for the few windows on display (peaks).
+    Returns Window (position in starts), Term, Count, best first within each window.
+    """
+    rows, window = window_rows(starts, ends)
+    df = pl.DataFrame({"Window": window, "Message": messages["Message"].gather(rows)})
+    return (
+        count_terms(df, by="Window")
+        .sort(["Window", "Count", "Term"], descending=[False, True, False])
+        .group_by("Window", maintain_order=True)
+        .head(k)
+    )
+
+
+def format_top_terms(top_terms: pl.DataFrame, n_windows):
+    """One "kekw ×34, lul ×12" string per window."""
+    labels = [""] * n_windows
+    grouped = top_terms.group_by("Window", maintain_order=True).agg(
+        pl.format("{} ×{}", pl.col("Term"), pl.col("Count")).str.join(", ").alias("Label")
+    )
+    for window, label in grouped.iter_rows():
+        labels[window] = label
+    return labels
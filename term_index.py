@@ -0,0 +1,170 @@
+from dataclasses import dataclass
+
+import numpy as np
+import polars as pl
+
+from cache_utils import load_cached_frame, store_cached_frame
+from chat_index import ChatIndex, first_row_at, row_range, window_rows
+from processing import select_peaks
+from term_counts import OTHER_WHITESPACE, tokens_expr
+
+# The characters term_counts.TOKEN_STRIP removes
+TOKEN_STRIP_CHARS = ',?!"'
+
+
+@dataclass
+class TermIndex:
+    """
+    Inverted index: for every normalized token (same normalization as term_counts), the seconds
+    it occurs in and how many times. One term's postings are a contiguous slice, sorted by second.
+    """
+    terms: pl.Series            # sorted vocabulary
+    term_start: np.ndarray      # term i's postings are [term_start[i], term_start[i + 1])
+    seconds: np.ndarray         # posting second
+    counts: np.ndarray          # occurrences of the term in that second
+
+
+def _postings(messages: pl.DataFrame) -> pl.DataFrame:
+    """Term/Time/Count rows sorted by Term then Time, the on-disk form of a TermIndex."""
+    return (
+        messages.select([pl.col("Time").cast(pl.Int64), tokens_expr().alias("Term")])
+        .explode("Term")
+        .filter(pl.col("Term") != "")
+        .group_by(["Term", "Time"])
+        .agg(pl.len().cast(pl.Int64).alias("Count"))
+        .sort(["Term", "Time"])
+    )
+
+
+def _from_postings(postings: pl.DataFrame) -> TermIndex:
+    terms = postings["Term"]
+    # Postings are sorted by term, so a term's block starts wherever the term changes
+    starts = np.flatnonzero(terms.ne_missing(terms.shift(1)).to_numpy())
+    return TermIndex(
+        terms=terms.gather(starts),
+        term_start=np.append(starts, postings.height).astype(np.int64),
+        seconds=postings["Time"].to_numpy(),
+        counts=postings["Count"].to_numpy(),
+    )
+
+
+def build_term_index(messages: pl.DataFrame) -> TermIndex:
+    return _from_postings(_postings(messages))
+
+
+def load_term_index(messages: pl.DataFrame, digest=None, filters_key=None) -> TermIndex:
+    """
+    build_term_index, cached on disk next to the parsed chat when digest is given.
+    The index covers filtered messages, so filters_key (FilterConfig.fingerprint()) is part of the key.
+    """
+    kind = "terms" if filters_key is None else f"terms-{filters_key}"
+    postings = load_cached_frame(digest, kind) if digest is not None else None
+    if postings is None:
+        postings = _postings(messages)
+        if digest is not None:
+            store_cached_frame(digest, postings, kind)
+    return _from_postings(postings)
+
+
+def query_terms(query):
+    """Normalized tokens of a search query, e.g. "Clip it!" -> ["clip", "it"]."""
+    return [t for t in pl.select(pl.lit(query).alias("Message")).select(tokens_expr())["Message"][0] if t]
+
+
+def term_postings(index: TermIndex, term, time_range=None):
+    """(seconds, counts) of one normalized term inside an inclusive time range, empty arrays if it never occurs."""
+    i = index.terms.search_sorted(term, "left")
+    if i >= len(index.terms) or index.terms[i] != term:
+        return index.seconds[:0], index.counts[:0]
+    lo, hi = index.term_start[i], index.term_start[i + 1]
+    if time_range is not None:
+        seconds = index.seconds[lo:hi]
+        lo, hi = lo + np.searchsorted(seconds, time_range[0], "left"), lo + np.searchsorted(seconds, time_range[1], "right")
+    return index.seconds[lo:hi], index.counts[lo:hi]
+
+
+def keyword_counts(index: TermIndex, chat_index: ChatIndex, query, time_range=None):
+    """
+    (seconds, counts) of a query, optionally inside an inclusive time range. A single token
+    comes straight from its postings.
+    For several tokens ("clip it") only seconds containing all of them are candidates, and the
+    phrase is counted exactly in those seconds' messages, so no full scan is needed.
+    Overlapping occurrences count separately: "ha ha" occurs twice in "ha ha ha".
+    """
+    tokens = query_terms(query)
+    if not tokens:
+        return index.seconds[:0], index.counts[:0]
+    postings = [term_postings(index, token, time_range) for token in tokens]
+    seconds, counts = postings[0]
+    if len(tokens) == 1:
+        return seconds, counts
+    for other, _ in postings[1:]:
+        seconds = np.intersect1d(seconds, other, assume_unique=True)
+    if not len(seconds):
+        return seconds, counts[:0]
+
+    k = np.searchsorted(chat_index.seconds, seconds)
+    rows, second = window_rows(chat_index.second_start[k], chat_index.second_start[k + 1])
+    # Normalizing is the slow part. Only messages containing the phrase as typed, or something
+    # normalization removes or maps to a space (a stripped character, a double space, a tab...),
+    # can contain it afterwards
+    message = pl.col("Message")
+    if all(token.isascii() for token in tokens):
+        candidate = (
+            message.str.contains_any([" ".join(tokens)], ascii_case_insensitive=True)
+            | message.str.contains_any(list(TOKEN_STRIP_CHARS) + ["  "])
+            | message.str.contains(OTHER_WHITESPACE)
+        )
+    else:
+        candidate = pl.lit(True)
+    # A match is the query's tokens in a row within one message, starting at any token
+    term, msg = pl.col("Term"), pl.col("Msg")
+    match = pl.all_horizontal([
+        (term.shift(-j) == token) & (msg.shift(-j) == msg) for j, token in enumerate(tokens)
+    ]).fill_null(False)
+    counts = (
+        pl.DataFrame({"Second": second, "Message": chat_index.messages["Message"].gather(rows)})
+        .filter(candidate)
+        .with_row_index("Msg")
+        .select(["Msg", "Second", tokens_expr().alias("Term")])
+        .explode("Term")
+        .filter(term != "")
+        .select(["Second", match.alias("Count")])
+        .group_by("Second").agg(pl.col("Count").sum())
+        .filter(pl.col("Count") > 0)
+        .sort("Second")
+    )
+    return seconds[counts["Second"].to_numpy()], counts["Count"].to_numpy().astype(np.int64)
+
+
+def keyword_windows(index: TermIndex, chat_index: ChatIndex, query, window_size, window_type="Sliding", time_range=None) -> pl.DataFrame:
+    """
+    Occurrences of query per window, in the same Time/MsgStart/MsgEnd layout as the UUIW engines
+    (score column Count). Sliding windows are [t - window_size, t] for every second the query occurs in,
+    which is where every sliding maximum lies.
+    """
+    seconds, counts = keyword_counts(index, chat_index, query, time_range)
+    r0, r1, _, _ = row_range(chat_index, time_range)
+    if window_type == "Sliding":
+        total = np.concatenate(([0], np.cumsum(counts)))
+        times = seconds
+        scores = total[1:] - total[np.searchsorted(seconds, seconds - window_size, "left")]
+        starts, ends = first_row_at(chat_index, times - window_size), first_row_at(chat_index, times + 1)
+    else:
+        window_id = seconds // window_size
+        block = np.concatenate(([0], np.flatnonzero(np.diff(window_id)) + 1)).astype(np.int64) if len(seconds) else np.zeros(0, dtype=np.int64)
+        times = window_id[block] * window_size
+        scores = np.add.reduceat(counts, block) if len(block) else counts[:0]
+        starts, ends = first_row_at(chat_index, times), first_row_at(chat_index, times + window_size)
+    # Messages outside the selected range aren't shown, as in the UUIW engines
+    starts, ends = np.clip(starts, r0, r1), np.clip(ends, r0, r1)
+    return pl.DataFrame(
+        {"Time": times, "Count": scores, "MsgStart": starts, "MsgEnd": ends},
+        schema={"Time": pl.Int64, "Count": pl.Int64, "MsgStart": pl.Int64, "MsgEnd": pl.Int64},
+    )
+
+
+def keyword_spikes(index: TermIndex, chat_index: ChatIndex, query, window_size, slack, n, window_type="Sliding", time_range=None) -> pl.DataFrame:
+    """Top n keyword windows at least slack seconds apart, best first (the get_top_peaks rule)."""
+    windows = keyword_windows(index, chat_index, query, window_size, window_type, time_range)
+    return windows[select_peaks(windows["Time"].to_numpy(), windows["Count"].to_numpy(), slack, n)]
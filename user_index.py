@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+
+import numpy as np
+import polars as pl
+
+
+@dataclass
+class UserIndex:
+    """
+    Per-user view of a messages frame, built once at ingest. Users are numbered 0..n-1 in
+    leaderboard order (most messages first, then by name), each user's message rows are a
+    contiguous, chat-ordered slice of `rows`, so every lookup costs O(result size).
+    """
+    names: pl.Series                # user name per user number
+    message_counts: np.ndarray      # messages per user
+    distinct_messages: np.ndarray   # distinct message texts per user
+    rows: np.ndarray                # row offsets into the messages frame, grouped by user
+    user_start: np.ndarray          # user u's rows are rows[user_start[u]:user_start[u + 1]]
+    row_time: np.ndarray            # Time of each entry in rows (sorted within a user)
+    number: dict                    # user name -> user number
+
+
+def build_user_index(messages: pl.DataFrame) -> UserIndex:
+    """messages: any frame with Time, User and Message columns (e.g. prepare_messages output)."""
+    users = (
+        messages.select(["Time", pl.col("User").cast(pl.String), "Message"])
+        .with_row_index("Row")
+        .group_by("User")
+        .agg([
+            pl.col("Row"),
+            pl.col("Time"),
+            pl.len().alias("Messages"),
+            pl.col("Message").drop_nulls().n_unique().alias("DistinctMessages"),
+        ])
+        .sort(["Messages", "User"], descending=[True, False], nulls_last=True)
+    )
+    counts = users["Messages"].to_numpy().astype(np.int64)
+    return UserIndex(
+        names=users["User"],
+        message_counts=counts,
+        distinct_messages=users["DistinctMessages"].to_numpy().astype(np.int64),
+        rows=users["Row"].explode().to_numpy().astype(np.int64),
+        user_start=np.concatenate(([0], np.cumsum(counts))),
+        row_time=users["Time"].explode().to_numpy().astype(np.int64),
+        number={name: i for i, name in enumerate(users["User"].to_list())},
+    )
+
+
+def leaderboard(index: UserIndex, n=25) -> pl.DataFrame:
+    """Top n chatters by message count, replaces chat_parser's whole-frame groupby."""
+    n = min(n, len(index.message_counts))
+    return pl.DataFrame({
+        "User": index.names.head(n),
+        "Messages": index.message_counts[:n],
+        "DistinctMessages": index.distinct_messages[:n],
+    })
+
+
+def user_rows(index: UserIndex, user, time_range=None) -> np.ndarray:
+    """Message rows of one user in chat order, optionally inside an inclusive time range (empty if unknown)."""
+    u = index.number.get(user)
+    if u is None:
+        return np.zeros(0, dtype=np.int64)
+    lo, hi = index.user_start[u], index.user_start[u + 1]
+    if time_range is not None:
+        times = index.row_time[lo:hi]
+        lo, hi = lo + np.searchsorted(times, time_range[0], "left"), lo + np.searchsorted(times, time_range[1], "right")
+    return index.rows[lo:hi]
+
+
+def user_activity(index: UserIndex, user, duration, bin_seconds=60) -> np.ndarray:
+    """Messages per bin_seconds over [0, duration], for a sparkline."""
+    u = index.number.get(user)
+    bins = duration // bin_seconds + 1
+    if u is None:
+        return np.zeros(bins, dtype=np.int64)
+    times = index.row_time[index.user_start[u]:index.user_start[u + 1]]
+    return np.bincount(np.clip(times // bin_seconds, 0, bins - 1), minlength=bins)
+
+
+def user_messages(index: UserIndex, messages: pl.DataFrame, user, time_range=None) -> pl.DataFrame:
+    """Time and Message of one user's messages, e.g. around a peak."""
+    return messages[user_rows(index, user, time_range)].select(["Time", "Message"])